@@ -2,8 +2,9 @@ from django.contrib import admin
 from .models import (
     MediaAsset, SEO, Navigation, Hero, About, Stat, Service, ServicesSection,
     Portfolio, PortfolioProject, Testimonial, FAQ, FAQSection, Contact,
-    ContactInfo, ContactFormField, SocialLink, Footer
+    ContactInfo, ContactFormField, SocialLink, Footer, HomepageSnapshot, ChatCall
 )
+from .snapshots import activate_homepage_snapshot
 
 
 @admin.register(MediaAsset)
@@ -152,3 +153,32 @@ class FooterAdmin(admin.ModelAdmin):
     list_display = ['copyright_text', 'is_active', 'updated_at']
     list_filter = ['is_active']
     readonly_fields = ['updated_at']
+
+
+@admin.register(HomepageSnapshot)
+class HomepageSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['version', 'is_current', 'build_ms', 'created_at']
+    list_filter = ['is_current']
+    readonly_fields = ['version', 'content', 'content_version', 'build_ms', 'is_current', 'created_at']
+    actions = ['make_current']
+
+    @admin.action(description='Roll back the homepage to the selected snapshot')
+    def make_current(self, request, queryset):
+        if queryset.count() != 1:
+            self.message_user(request, 'Select exactly one snapshot.', level='error')
+            return
+        snapshot = activate_homepage_snapshot(queryset.get().version)
+        self.message_user(request, f'Homepage now serves snapshot v{snapshot.version}.')
+
+
+@admin.register(ChatCall)
+class ChatCallAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'source', 'outcome', 'error', 'total_ms', 'upstream_ms', 'completion_tokens']
+    list_filter = ['outcome', 'source', 'streamed']
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
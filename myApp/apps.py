@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MyappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'myApp'
+
+    def ready(self):
+        # Connect cache invalidation signal handlers
+        from . import signals  # noqa: F401
@@ -0,0 +1,227 @@
+"""
+Chat - One turn of the persona chat, shared by the HTTP view and the WebSocket consumer
+
+chat_turn() takes the visitor's message through the whole pipeline and
+yields the reply as events:
+
+    {"start": true, "source": ...}   once the reply is on its way
+    {"delta": "..."}                 per chunk of text
+    {"done": true, "response": "...", "source": ...}
+
+"source" is "local" (an FAQ or service answers the question, see
+utils.retrieval.find_local_answer), "cache" (utils.response_cache),
+"coalesced" (an identical opener's reply, utils.single_flight) or the chat
+backend's name ("openai", or "fake" - see utils.chat_backends).
+
+Everything that can refuse the turn - the backend not being configured
+(ChatNotConfigured), every in-flight slot taken (RateLimited), the circuit
+breaker being open (CircuitOpenError), OpenAI failing after its retries
+(openai.APIError) - is raised before the start event, so callers can answer
+with a proper status. An error after it means the stream broke midway.
+
+Per-client rate limits are the caller's job (see utils.rate_limit).
+
+Every turn - answered, refused, failed or abandoned by the client - is
+recorded with its timings and token counts by utils.telemetry.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+
+from .utils import chat_sessions, response_cache, single_flight, telemetry
+from .utils.chat_backends import get_backend
+from .utils.openai_client import CircuitOpenError, create_chat_completion
+from .utils.prompt_builder import build_prompt, count_message_tokens, count_tokens
+from .utils.rate_limit import InFlightSlot, RateLimited
+from .utils.retrieval import find_local_answer, get_chat_context
+
+# System prompt that captures Maria Gregory's voice
+CHAT_SYSTEM_PROMPT = """You are Maria Gregory, a Mentor of Mentors. You work with leaders, coaches, and high-responsibility professionals — the people everyone else turns to.
+
+Your communication style:
+- Use first-person language ("I", "me", "my")
+- Be warm, reflective, and deeply present
+- Ask thoughtful, open-ended questions that invite self-reflection
+- Acknowledge the weight people carry without minimizing it
+- Speak with wisdom, not quick answers
+- Create space for people to be fully human — messy, honest, and still deeply respected
+- Use language that feels like a trusted guide, not a coach or consultant
+- Be gentle but honest
+- Reference your work, your book "The Lion You Don't See", and your mentorship approach naturally when relevant
+
+Key themes you often explore:
+- The weight of leadership and responsibility
+- Where leaders go when they need support
+- The parts of leadership that don't fit on LinkedIn
+- Being fully human while leading
+- Inner strength and the "lion within"
+- The importance of having someone in your corner
+
+Keep responses conversational, warm, and typically 2-4 sentences. Always end with a question or invitation to go deeper when appropriate. Be authentic to who Maria is — someone who sees strength in others and helps them remember their own wisdom."""
+
+CHAT_COMPLETION_OPTIONS = {
+    'model': "gpt-4o-mini",  # Using gpt-4o-mini for cost-effectiveness, can upgrade to gpt-4 if needed
+    'temperature': 0.8,  # Slightly creative but still consistent
+    'max_tokens': 300,  # Keep responses concise
+    'top_p': 0.9,
+}
+
+# Replies depend on both; a change to either must not reuse earlier replies
+PERSONA = [CHAT_SYSTEM_PROMPT, CHAT_COMPLETION_OPTIONS]
+
+NOT_CONFIGURED_MESSAGE = (
+    'OpenAI API key not configured. Please add OPENAI_API_KEY to your .env file in the project root.'
+)
+
+
+class ChatNotConfigured(Exception):
+    """The chat backend cannot be used (no OpenAI API key)"""
+
+
+async def _known_reply(session_id, session, user_message, reply, source):
+    await chat_sessions.save_turn(session_id, session, user_message, reply)
+    yield {'start': True, 'source': source}
+    yield {'delta': reply}
+    yield {'done': True, 'response': reply, 'source': source}
+
+
+def _elapsed_ms(since):
+    return (time.perf_counter() - since) * 1000
+
+
+async def chat_turn(session_id, session, user_message, stream=True):
+    """
+    Answer one message of the session (as loaded by chat_sessions.load_session)
+    and save the turn. With stream=False the backend's reply arrives whole,
+    as a single delta.
+    """
+    started = time.perf_counter()
+    call = {'streamed': stream}
+    outcome, error = 'cancelled', ''
+    events = _turn_events(session_id, session, user_message, stream, started, call)
+    try:
+        async for event in events:
+            yield event
+        outcome = 'ok'
+    except ChatNotConfigured:
+        outcome = 'not_configured'
+        raise
+    except RateLimited:
+        outcome = 'busy'
+        raise
+    except CircuitOpenError:
+        outcome = 'circuit_open'
+        raise
+    except Exception as e:
+        outcome, error = 'error', type(e).__name__
+        raise
+    finally:
+        # Closed here, not left to garbage collection, so the slot is freed now
+        await events.aclose()
+        telemetry.record(outcome=outcome, error=error, total_ms=_elapsed_ms(started), **call)
+
+
+async def _turn_events(session_id, session, user_message, stream, started, call):
+    """chat_turn's events; fills `call` with what telemetry records"""
+    # An opening question answered by an FAQ or service: no OpenAI call.
+    # Further into a conversation the visitor is talking to Maria, not the FAQ
+    opening = not session['messages'] and not session['summary']
+    local_answer = await sync_to_async(find_local_answer)(user_message) if opening else None
+    if local_answer is not None:
+        call['source'] = 'local'
+        async for event in _known_reply(session_id, session, user_message, local_answer['answer'], 'local'):
+            yield event
+        return
+
+    # Same opening line as an earlier chat (opt-in, see utils.response_cache)
+    cached_reply = await sync_to_async(response_cache.get_cached_reply)(session, user_message, PERSONA)
+    if cached_reply is not None:
+        call['source'] = 'cache'
+        async for event in _known_reply(session_id, session, user_message, cached_reply, 'cache'):
+            yield event
+        return
+
+    # OpenAI unless CHAT_BACKEND says otherwise
+    backend = get_backend()
+    call.update(source=backend.name, model=CHAT_COMPLETION_OPTIONS['model'])
+    if not backend.is_configured():
+        raise ChatNotConfigured(NOT_CONFIGURED_MESSAGE)
+
+    # The same opener already waiting on OpenAI: share its reply
+    flight = None
+    if single_flight.is_enabled() and opening:
+        flight = await single_flight.join(user_message, PERSONA)
+        if not flight.is_leader:
+            shared_reply = await flight.wait()
+            flight = None
+            if shared_reply is not None:
+                call['source'] = 'coalesced'
+                async for event in _known_reply(session_id, session, user_message, shared_reply, 'coalesced'):
+                    yield event
+                return
+            # The leader failed: ask OpenAI ourselves
+
+    slot = None
+    completion = None
+    try:
+        # Site content relevant to the message, from the local retrieval index
+        context = await sync_to_async(get_chat_context)(user_message)
+        # System prompt, context, summary of older turns and the recent ones that fit the token budget
+        messages = build_prompt(CHAT_SYSTEM_PROMPT, session, user_message, context=context)
+
+        # Held until the reply is complete; raises RateLimited when every slot is taken
+        slot = await InFlightSlot.acquire()
+
+        # Pooled client, retries and circuit breaker
+        call['queue_ms'] = _elapsed_ms(started)
+        upstream_started = time.perf_counter()
+        usage = None
+        if stream:
+            completion = await create_chat_completion(
+                backend, messages=messages, stream=True, stream_options={'include_usage': True},
+                **CHAT_COMPLETION_OPTIONS
+            )
+            yield {'start': True, 'source': backend.name}
+            parts = []
+            async for chunk in completion:
+                call['model'] = chunk.model or call['model']
+                # With include_usage the last chunk carries the usage and no choices
+                usage = getattr(chunk, 'usage', None) or usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if not parts:
+                        call['ttft_ms'] = _elapsed_ms(upstream_started)
+                    parts.append(delta)
+                    yield {'delta': delta}
+            reply = ''.join(parts).strip()
+        else:
+            completion = await create_chat_completion(backend, messages=messages, **CHAT_COMPLETION_OPTIONS)
+            call['model'] = completion.model or call['model']
+            usage = completion.usage
+            reply = completion.choices[0].message.content.strip()
+            yield {'start': True, 'source': backend.name}
+            yield {'delta': reply}
+        call['upstream_ms'] = _elapsed_ms(upstream_started)
+        await slot.release()
+
+        # Estimated when the backend reports no usage (the fakes)
+        call['prompt_tokens'] = usage.prompt_tokens if usage else count_message_tokens(messages)
+        call['completion_tokens'] = usage.completion_tokens if usage else count_tokens(reply)
+
+        if flight is not None:
+            await flight.publish(reply)
+        await sync_to_async(response_cache.cache_reply)(session, user_message, PERSONA, reply)
+        await chat_sessions.save_turn(session_id, session, user_message, reply)
+        yield {'done': True, 'response': reply, 'source': backend.name}
+    finally:
+        # However the turn ends: close the stream (settling the circuit
+        # breaker's trial call), free the slot, and let any followers of a
+        # failed leader ask OpenAI themselves (all are no-ops when done)
+        if stream and completion is not None:
+            await completion.close()
+        if slot is not None:
+            await slot.release()
+        if flight is not None:
+            await flight.close()
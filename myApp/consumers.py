@@ -0,0 +1,130 @@
+"""
+Consumers - The persona chat over a WebSocket (ws/chat/, see routing.py)
+
+One socket carries a whole conversation. Connect with ?session_id=... to
+resume one; the server answers {"session_id": ...} and the client sends
+{"message": "..."} per turn. The reply comes back with the same events as
+the streamed HTTP endpoint (see views.stream_chat_events):
+
+    {"delta": "..."}                 per chunk of text
+    {"done": true, "response": "...", "source": "...", "session_id": "..."}
+    {"error": "...", "retry_after": 5}   retry_after only when throttled
+
+Turns go through chat.chat_turn and utils.rate_limit exactly like
+views.chat_with_maria; the browser falls back to that endpoint when it
+cannot open a socket.
+
+Backpressure: a connection answers one message at a time, with at most
+CHAT_WS_MAX_QUEUED more waiting behind it; past that a message is refused
+with an error instead of piling up work. Each event is sent once the
+previous one was handed to the server, so a slow client holds up its own
+reply, not the worker.
+
+A connection with no message and no reply in progress for
+CHAT_WS_IDLE_TIMEOUT seconds is closed with code 4000.
+"""
+import asyncio
+import math
+import time
+from urllib.parse import parse_qs
+
+import openai
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.conf import settings
+
+from .chat import ChatNotConfigured, chat_turn
+from .utils import chat_sessions
+from .utils.openai_client import CircuitOpenError
+from .utils.rate_limit import BUSY_MESSAGE, RateLimited, check_client_rate_limit, get_scope_client_ip
+
+IDLE_CLOSE_CODE = 4000
+
+
+def get_max_queued():
+    return getattr(settings, 'CHAT_WS_MAX_QUEUED', 2)
+
+
+def get_idle_timeout():
+    return getattr(settings, 'CHAT_WS_IDLE_TIMEOUT', 300)
+
+
+class ChatConsumer(AsyncJsonWebsocketConsumer):
+
+    async def connect(self):
+        query = parse_qs(self.scope.get('query_string', b'').decode('latin-1'))
+        session_id = query.get('session_id', [None])[0]
+        self.session_id = session_id if chat_sessions.is_session_id(session_id) else None
+        self.client_ip = get_scope_client_ip(self.scope)
+        self.queue = asyncio.Queue(maxsize=get_max_queued())
+        self.busy = False
+        self.last_activity = time.monotonic()
+
+        await self.accept()
+        await self.send_json({'session_id': self.session_id})
+        self.worker = asyncio.create_task(self.answer_messages())
+        self.idle_watch = asyncio.create_task(self.close_when_idle())
+
+    async def disconnect(self, code):
+        for task in (getattr(self, 'worker', None), getattr(self, 'idle_watch', None)):
+            if task is not None:
+                task.cancel()
+
+    async def receive_json(self, content, **kwargs):
+        self.last_activity = time.monotonic()
+        message = content.get('message') if isinstance(content, dict) else None
+        message = message.strip() if isinstance(message, str) else ''
+        if not message:
+            await self.send_json({'error': 'Message is required'})
+            return
+        if len(message) > chat_sessions.get_max_message_chars():
+            await self.send_json({'error': 'Message is too long'})
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            await self.send_json({'error': BUSY_MESSAGE, 'retry_after': settings.CHAT_BUSY_RETRY_AFTER})
+
+    async def close_when_idle(self):
+        timeout = get_idle_timeout()
+        while True:
+            idle_for = time.monotonic() - self.last_activity
+            if not self.busy and self.queue.empty() and idle_for >= timeout:
+                self.worker.cancel()
+                await self.close(code=IDLE_CLOSE_CODE)
+                return
+            await asyncio.sleep(max(timeout - idle_for, 1))
+
+    async def answer_messages(self):
+        while True:
+            message = await self.queue.get()
+            self.busy = True
+            try:
+                await self.answer(message)
+            finally:
+                self.busy = False
+                self.last_activity = time.monotonic()
+
+    async def answer(self, user_message):
+        """One turn, as views.chat_with_maria does it, with errors sent as events"""
+        events = None
+        try:
+            await check_client_rate_limit(self.client_ip, self.session_id)
+            self.session_id, session = await chat_sessions.load_session(self.session_id)
+            events = chat_turn(self.session_id, session, user_message, stream=True)
+            async for event in events:
+                if event.get('start'):
+                    continue
+                if event.get('done'):
+                    event = dict(event, session_id=self.session_id)
+                await self.send_json(event)
+        except ChatNotConfigured as e:
+            await self.send_json({'error': str(e)})
+        except (RateLimited, CircuitOpenError) as e:
+            await self.send_json({'error': str(e), 'retry_after': math.ceil(e.retry_after)})
+        except openai.APIError as e:
+            await self.send_json({'error': f'OpenAI API error: {str(e)}'})
+        except Exception as e:
+            await self.send_json({'error': f'An error occurred: {str(e)}'})
+        finally:
+            if events is not None:
+                await events.aclose()
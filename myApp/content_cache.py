@@ -0,0 +1,307 @@
+"""
+Content cache - Snapshot of the assembled homepage content
+
+The homepage sections are stored in Django's cache framework under a
+content version. Every process also keeps the last snapshot it used in
+memory, so a steady-state request costs one cache lookup (the version) and
+no content queries. The cache must be shared by every process (Redis, or
+database tables without REDIS_URL - see CACHES in settings), or an edit in
+one worker would never invalidate the others. Saving or deleting any content model bumps the
+version (see signals.py), which makes every process rebuild on its next
+request.
+
+Sections are loaded lazily (see LazyHomepageContent), so the snapshot only
+ever holds the sections the templates actually read.
+
+The version is stored together with the time it was created, which the
+homepage uses as its ETag / Last-Modified validators (homepage_etag and
+homepage_last_modified, shared by the view and the static export).
+
+Each content model also has its own version, so the rendered partials can be
+cached per section (see templatetags/fragment_cache.py) and only the
+sections reading an edited model are re-rendered.
+
+On a cache miss the sections are read from the current HomepageSnapshot row
+(see snapshots.py) when it was built for the current version.
+
+The fully rendered page is cached as well (get_homepage_page). After an edit
+exactly one worker rebuilds it under a cache lock while the others keep
+serving the previous page for up to HOMEPAGE_MAX_STALENESS seconds.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.dispatch import receiver
+from django.utils.autoreload import file_changed
+
+from .content_helpers import SECTION_LOADERS, SECTION_MODELS, LazyHomepageContent
+from .models import HomepageSnapshot
+
+VERSION_KEY = 'homepage:content:version'
+SNAPSHOT_KEY = 'homepage:content:snapshot'
+MODEL_VERSION_KEY = 'homepage:model-version:{}'
+PAGE_KEY = 'homepage:page'
+PAGE_LOCK_KEY = 'homepage:page:lock'
+
+# Seconds a request without any usable page waits for another worker's rebuild
+PAGE_REBUILD_WAIT = 5
+
+HOMEPAGE_TEMPLATES_DIR = Path(__file__).resolve().parent / 'templates' / 'myApp'
+
+_homepage_templates_state = None
+
+# Process-local front tiers: (version, sections) and the last rendered page
+_local_snapshot = None
+_local_page = None
+_local_lock = threading.Lock()
+
+
+def _new_version(version=None):
+    return (version or uuid.uuid4().hex, time.time())
+
+
+def get_content_state():
+    """
+    Return (version, modified) for the current homepage content, where
+    modified is the Unix time the version was created.
+    A new version is created on first use if the cache has none yet.
+    """
+    state = cache.get(VERSION_KEY)
+    if state is None:
+        state = _new_version()
+        if not cache.add(VERSION_KEY, state, timeout=None):
+            # Another worker created it first
+            state = cache.get(VERSION_KEY) or state
+    return state
+
+
+def get_content_version():
+    """Return the current homepage content version"""
+    return get_content_state()[0]
+
+
+def get_model_versions(models):
+    """
+    Return {model label: version} for the given content models, creating a
+    version for any model the cache does not know yet.
+    """
+    keys = {MODEL_VERSION_KEY.format(model._meta.label): model._meta.label for model in models}
+    found = cache.get_many(list(keys))
+    versions = {}
+    for key, label in keys.items():
+        version = found.get(key)
+        if version is None:
+            version = uuid.uuid4().hex
+            if not cache.add(key, version, timeout=None):
+                version = cache.get(key) or version
+        versions[label] = version
+    return versions
+
+
+def invalidate_homepage_content(*models, version=None):
+    """
+    Bump the content version so every process rebuilds its snapshot, and
+    the versions of the changed models so fragments reading them re-render.
+    Without models every fragment is re-rendered. Returns the new version.
+    """
+    global _local_snapshot
+    if models:
+        cache.set_many({MODEL_VERSION_KEY.format(model._meta.label): uuid.uuid4().hex for model in models}, timeout=None)
+    else:
+        cache.delete_many([MODEL_VERSION_KEY.format(m._meta.label) for m in SECTION_MODELS.values()])
+    state = _new_version(version)
+    cache.set(VERSION_KEY, state, timeout=None)
+    with _local_lock:
+        _local_snapshot = None
+    return state[0]
+
+
+def get_homepage_templates_state():
+    """
+    Return (digest, mtime) of the homepage templates, computed once per
+    process, so a deploy that changes the markup also changes validators
+    and keys. Under runserver an edited template resets it (see
+    reset_homepage_templates_state).
+    """
+    global _homepage_templates_state
+    if _homepage_templates_state is None:
+        digest = hashlib.sha256()
+        mtime = 0
+        for path in sorted(HOMEPAGE_TEMPLATES_DIR.rglob('*.html')):
+            digest.update(path.read_bytes())
+            mtime = max(mtime, path.stat().st_mtime)
+        _homepage_templates_state = (digest.hexdigest()[:16], mtime)
+    return _homepage_templates_state
+
+
+@receiver(file_changed)
+def reset_homepage_templates_state(sender, file_path, **kwargs):
+    """The autoreloader saw a file change: rehash if it was a homepage template"""
+    global _homepage_templates_state
+    if HOMEPAGE_TEMPLATES_DIR in Path(file_path).parents:
+        _homepage_templates_state = None
+
+
+def _request_content_state(request):
+    """get_content_state, read once per request (the validators are asked several times)"""
+    if request is None:
+        return get_content_state()
+    state = getattr(request, '_homepage_content_state', None)
+    if state is None:
+        state = request._homepage_content_state = get_content_state()
+    return state
+
+
+def homepage_etag(request):
+    """Strong ETag for the homepage: content version + template digest"""
+    try:
+        version, modified = _request_content_state(request)
+    except Exception:
+        return None
+    return f"{version}-{get_homepage_templates_state()[0]}"
+
+
+def homepage_last_modified(request):
+    """Last-Modified for the homepage: latest content or template change"""
+    try:
+        version, modified = _request_content_state(request)
+    except Exception:
+        return None
+    modified = max(modified, get_homepage_templates_state()[1])
+    return datetime.fromtimestamp(modified, tz=timezone.utc)
+
+
+def _get_snapshot_sections(version):
+    """Sections cached for this version, from the local tier or the shared cache"""
+    global _local_snapshot
+    local = _local_snapshot
+    if local is not None and local[0] == version:
+        return local[1]
+
+    snapshot = cache.get(SNAPSHOT_KEY)
+    if snapshot is not None and snapshot.get('version') == version:
+        sections = snapshot['sections']
+    else:
+        # One row holding every section, if it was built for this version
+        sections = _get_materialized_sections(version)
+        if sections is None:
+            return {}
+        cache.set(
+            SNAPSHOT_KEY,
+            {'version': version, 'sections': sections},
+            timeout=getattr(settings, 'HOMEPAGE_CACHE_TIMEOUT', 60 * 60 * 24),
+        )
+
+    with _local_lock:
+        _local_snapshot = (version, sections)
+    return sections
+
+
+def _get_materialized_sections(version):
+    """Sections from the current HomepageSnapshot row, or None if it is out of date"""
+    try:
+        row = HomepageSnapshot.objects.filter(is_current=True).values('content', 'content_version').first()
+    except DatabaseError:
+        return None
+    if row is None or row['content_version'] != version:
+        return None
+    # Sections missing from the stored content had no active row
+    return {key: row['content'].get(key) for key in SECTION_LOADERS}
+
+
+def get_homepage_content():
+    """
+    Return the homepage content for the current request.
+
+    Sections already in the snapshot are served from it; any other section
+    is queried when a template first reads it. Call store_homepage_content()
+    after rendering to add those sections to the snapshot.
+    """
+    version = get_content_version()
+    return LazyHomepageContent(_get_snapshot_sections(version), version=version)
+
+
+def store_homepage_content(content):
+    """Merge sections loaded while rendering into the cached snapshot"""
+    global _local_snapshot
+    if not content.loaded_keys:
+        return
+
+    # A save that landed while we rendered has bumped the version again, so
+    # sections read under the old version are simply dropped
+    version = content.version
+    if get_content_version() != version:
+        return
+
+    snapshot = cache.get(SNAPSHOT_KEY)
+    sections = {}
+    if snapshot is not None and snapshot.get('version') == version:
+        sections.update(snapshot['sections'])
+    sections.update(content.sections)
+
+    cache.set(
+        SNAPSHOT_KEY,
+        {'version': version, 'sections': sections},
+        timeout=getattr(settings, 'HOMEPAGE_CACHE_TIMEOUT', 60 * 60 * 24),
+    )
+    with _local_lock:
+        _local_snapshot = (version, sections)
+
+
+def get_homepage_page(etag, modified, build):
+    """
+    Return the rendered homepage as a dict with 'html', 'etag' and
+    'last_modified' (Unix time of the content it was built from).
+
+    etag/modified describe the current content; build() renders it. When the
+    cached page is out of date, the worker that wins the rebuild lock calls
+    build() while everyone else serves the previous page, as long as the
+    content changed less than HOMEPAGE_MAX_STALENESS seconds ago.
+    """
+    global _local_page
+    page = _local_page
+    if page is not None and page['etag'] == etag:
+        return page
+
+    shared = cache.get(PAGE_KEY)
+    if shared is not None:
+        page = shared
+        if shared['etag'] == etag:
+            _local_page = shared
+            return shared
+
+    lock_timeout = getattr(settings, 'HOMEPAGE_REBUILD_LOCK_TIMEOUT', 30)
+    token = uuid.uuid4().hex
+    if cache.add(PAGE_LOCK_KEY, token, timeout=lock_timeout):
+        try:
+            page = {'html': build(), 'etag': etag, 'last_modified': modified}
+            # Another save may have landed while rendering; the page is still
+            # stored (it is newer than the last one) and simply rebuilt again
+            cache.set(PAGE_KEY, page, timeout=getattr(settings, 'HOMEPAGE_CACHE_TIMEOUT', 60 * 60 * 24))
+            _local_page = page
+            return page
+        finally:
+            if cache.get(PAGE_LOCK_KEY) == token:
+                cache.delete(PAGE_LOCK_KEY)
+
+    # Someone else is rebuilding
+    max_staleness = getattr(settings, 'HOMEPAGE_MAX_STALENESS', 30)
+    if page is not None and time.time() - modified <= max_staleness:
+        return page
+
+    # No page at all, or too stale to serve: wait briefly for the rebuild
+    deadline = time.monotonic() + min(PAGE_REBUILD_WAIT, lock_timeout)
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        page = cache.get(PAGE_KEY)
+        if page is not None and page['etag'] == etag:
+            _local_page = page
+            return page
+    return {'html': build(), 'etag': etag, 'last_modified': modified}
@@ -1,6 +1,13 @@
 """
 Content helpers - Convert database models to JSON format for templates
+
+Each homepage section is described by a SectionSpec in SECTION_SPECS and
+fetched with .values(), so only the listed columns are read and no model
+instances are built. Adding a section is one entry in SECTION_SPECS.
 """
+from collections.abc import Mapping
+from functools import partial
+
 from .models import (
     MediaAsset, SEO, Navigation, Hero, About, Stat, Service, ServicesSection,
     Portfolio, PortfolioProject, Testimonial, FAQ, FAQSection, Contact,
@@ -8,6 +15,140 @@ from .models import (
     LionSection, BooksSection, PublishedBook
 )
 
+DEFAULT_ORDERING = ('sort_order', 'id')
+
+# Primary key of the row behind every single-row section (see singletons.py)
+SINGLETON_PK = 1
+
+
+class SectionSpec:
+    """
+    How one homepage section is read from the database.
+
+    key: name of the section in the template content (content.<key>)
+    model: model the section is read from
+    fields: columns copied into the section, in output order
+    many: list of rows (ordered by `ordering`) instead of the singleton row
+    merge_content: merge the model's `content` JSONField into each row
+    active_only: only read rows with is_active=True
+    error_value: value used if the query fails (defaults to {} or [])
+    """
+
+    def __init__(self, key, model, fields, many=False, merge_content=False,
+                 ordering=DEFAULT_ORDERING, active_only=True, error_value=None):
+        self.key = key
+        self.model = model
+        self.fields = tuple(fields)
+        self.many = many
+        self.merge_content = merge_content
+        self.ordering = tuple(ordering)
+        self.active_only = active_only
+        self.error_value = error_value
+
+    @property
+    def columns(self):
+        """Columns fetched from the database"""
+        return self.fields + ('content',) if self.merge_content else self.fields
+
+    def get_error_value(self):
+        if self.error_value is not None:
+            return dict(self.error_value)
+        return [] if self.many else {}
+
+    def to_dict(self, row):
+        """Turn a .values() row into the section dict"""
+        if self.merge_content:
+            extra = row.pop('content')
+            row.update(extra)  # Merge any additional JSON content
+        return row
+
+
+SECTION_SPECS = (
+    SectionSpec('seo', SEO, [
+        'page_title', 'meta_description', 'meta_keywords', 'og_title', 'og_description',
+        'og_image', 'twitter_card', 'canonical_url',
+    ], active_only=False),
+    SectionSpec('navigation', Navigation, ['label', 'url', 'is_external'], many=True, ordering=('order', 'id')),
+    SectionSpec('hero', Hero, [
+        'title', 'subtitle', 'description', 'button_text', 'button_url', 'background_image_url',
+    ], merge_content=True),
+    SectionSpec('about', About, ['title', 'subtitle', 'description', 'image_url', 'quote'], merge_content=True),
+    SectionSpec('stats', Stat, ['label', 'value', 'description', 'icon'], many=True),
+    SectionSpec('services_section', ServicesSection, ['title', 'subtitle', 'description'], merge_content=True),
+    SectionSpec('services', Service, ['title', 'description', 'icon', 'image_url'], many=True, merge_content=True),
+    SectionSpec('portfolio', Portfolio, ['title', 'subtitle', 'description'], merge_content=True),
+    SectionSpec('portfolio_projects', PortfolioProject, [
+        'title', 'description', 'image_url', 'project_url', 'category',
+    ], many=True, merge_content=True),
+    SectionSpec('testimonials', Testimonial, [
+        'name', 'role', 'company', 'content', 'image_url', 'rating',
+    ], many=True),
+    SectionSpec('faq_section', FAQSection, ['title', 'subtitle', 'description'], merge_content=True),
+    SectionSpec('faqs', FAQ, ['question', 'answer', 'category'], many=True),
+    SectionSpec('contact', Contact, [
+        'cta_title', 'cta_subtitle', 'cta_description', 'cta_quote',
+        'cta_button1_text', 'cta_button1_url', 'cta_button2_text', 'cta_button2_url',
+        'cta_button3_text', 'cta_button3_url', 'title', 'subtitle', 'description',
+    ], merge_content=True),
+    SectionSpec('contact_info', ContactInfo, ['type', 'label', 'value', 'icon'], many=True),
+    SectionSpec('contact_form_fields', ContactFormField, [
+        'label', 'field_type', 'placeholder', 'is_required', 'options',
+    ], many=True),
+    SectionSpec('social_links', SocialLink, ['platform', 'label', 'url', 'icon'], many=True),
+    SectionSpec('footer', Footer, ['copyright_text'], merge_content=True,
+                error_value={'copyright_text': '© 2025 All rights reserved.'}),
+    SectionSpec('decades_section', DecadesSection, [
+        'title', 'subtitle', 'description', 'closing_quote',
+    ], merge_content=True),
+    SectionSpec('decades_timeline_items', DecadesTimelineItem, [
+        'period', 'title', 'organization', 'description', 'reflection', 'image_url', 'icon',
+    ], many=True),
+    SectionSpec('lion_section', LionSection, [
+        'title', 'icon', 'intro_text', 'paragraph_1', 'paragraph_2', 'reflection_question',
+        'background_image_url', 'book_cover_image_url', 'closing_quote',
+    ], merge_content=True),
+    SectionSpec('books_section', BooksSection, [
+        'title', 'subtitle', 'description', 'show_publishing_service', 'publishing_service_title',
+        'publishing_service_description', 'publishing_service_button_text',
+        'publishing_service_button_url',
+    ], merge_content=True),
+    SectionSpec('published_books', PublishedBook, [
+        'title', 'subtitle', 'description', 'cover_image_url', 'publisher', 'publication_year',
+        'purchase_url', 'amazon_url',
+    ], many=True),
+)
+
+
+def load_section(spec):
+    """
+    Read one section. Returns a list for list sections, a dict for single
+    sections, or None when the singleton row is missing or inactive.
+    """
+    queryset = spec.model.objects.all()
+    if spec.active_only:
+        queryset = queryset.filter(is_active=True)
+    try:
+        if spec.many:
+            rows = queryset.order_by(*spec.ordering).values(*spec.columns)
+            return [spec.to_dict(row) for row in rows]
+        row = queryset.filter(pk=SINGLETON_PK).values(*spec.columns).first()
+        return spec.to_dict(row) if row is not None else None
+    except Exception:
+        return spec.get_error_value()
+
+
+# Models read by get_homepage_content_from_db - saving or deleting any of
+# them invalidates the cached homepage content (see signals.py)
+HOMEPAGE_CONTENT_MODELS = tuple(spec.model for spec in SECTION_SPECS)
+
+# Section key -> the model it is read from; a cached fragment depends on the
+# versions of the models behind the sections it renders
+SECTION_MODELS = {spec.key: spec.model for spec in SECTION_SPECS}
+
+# Section key -> loader, in page order. A loader returns the section value, or
+# None when the section has no active row (the key is then left out).
+SECTION_LOADERS = {spec.key: partial(load_section, spec) for spec in SECTION_SPECS}
+
 
 def get_homepage_content_from_db():
     """
@@ -15,357 +156,53 @@ def get_homepage_content_from_db():
     Returns a dictionary matching the structure expected by templates.
     """
     content = {}
-    
-    # SEO
-    try:
-        seo = SEO.objects.first()
-        if seo:
-            content['seo'] = {
-                'page_title': seo.page_title,
-                'meta_description': seo.meta_description,
-                'meta_keywords': seo.meta_keywords,
-                'og_title': seo.og_title,
-                'og_description': seo.og_description,
-                'og_image': seo.og_image,
-                'twitter_card': seo.twitter_card,
-                'canonical_url': seo.canonical_url,
-            }
-    except:
-        content['seo'] = {}
-    
-    # Navigation
-    try:
-        nav_items = Navigation.objects.filter(is_active=True).order_by('order', 'id')
-        content['navigation'] = [
-            {
-                'label': item.label,
-                'url': item.url,
-                'is_external': item.is_external,
-            }
-            for item in nav_items
-        ]
-    except:
-        content['navigation'] = []
-    
-    # Hero
-    try:
-        hero = Hero.objects.filter(is_active=True).first()
-        if hero:
-            content['hero'] = {
-                'title': hero.title,
-                'subtitle': hero.subtitle,
-                'description': hero.description,
-                'button_text': hero.button_text,
-                'button_url': hero.button_url,
-                'background_image_url': hero.background_image_url,
-                **hero.content,  # Merge any additional JSON content
-            }
-    except:
-        content['hero'] = {}
-    
-    # About
-    try:
-        about = About.objects.filter(is_active=True).first()
-        if about:
-            content['about'] = {
-                'title': about.title,
-                'subtitle': about.subtitle,
-                'description': about.description,
-                'image_url': about.image_url,
-                'quote': about.quote,
-                **about.content,
-            }
-    except:
-        content['about'] = {}
-    
-    # Stats
-    try:
-        stats = Stat.objects.filter(is_active=True).order_by('sort_order', 'id')
-        content['stats'] = [
-            {
-                'label': stat.label,
-                'value': stat.value,
-                'description': stat.description,
-                'icon': stat.icon,
-            }
-            for stat in stats
-        ]
-    except:
-        content['stats'] = []
-    
-    # Services Section
-    try:
-        services_section = ServicesSection.objects.filter(is_active=True).first()
-        if services_section:
-            content['services_section'] = {
-                'title': services_section.title,
-                'subtitle': services_section.subtitle,
-                'description': services_section.description,
-                **services_section.content,
-            }
-    except:
-        content['services_section'] = {}
-    
-    # Services
-    try:
-        services = Service.objects.filter(is_active=True).order_by('sort_order', 'id')
-        content['services'] = [
-            {
-                'title': service.title,
-                'description': service.description,
-                'icon': service.icon,
-                'image_url': service.image_url,
-                **service.content,
-            }
-            for service in services
-        ]
-    except:
-        content['services'] = []
-    
-    # Portfolio
-    try:
-        portfolio = Portfolio.objects.filter(is_active=True).first()
-        if portfolio:
-            content['portfolio'] = {
-                'title': portfolio.title,
-                'subtitle': portfolio.subtitle,
-                'description': portfolio.description,
-                **portfolio.content,
-            }
-    except:
-        content['portfolio'] = {}
-    
-    # Portfolio Projects
-    try:
-        projects = PortfolioProject.objects.filter(is_active=True).order_by('sort_order', 'id')
-        content['portfolio_projects'] = [
-            {
-                'title': project.title,
-                'description': project.description,
-                'image_url': project.image_url,
-                'project_url': project.project_url,
-                'category': project.category,
-                **project.content,
-            }
-            for project in projects
-        ]
-    except:
-        content['portfolio_projects'] = []
-    
-    # Testimonials
-    try:
-        testimonials = Testimonial.objects.filter(is_active=True).order_by('sort_order', 'id')
-        content['testimonials'] = [
-            {
-                'name': testimonial.name,
-                'role': testimonial.role,
-                'company': testimonial.company,
-                'content': testimonial.content,
-                'image_url': testimonial.image_url,
-                'rating': testimonial.rating,
-            }
-            for testimonial in testimonials
-        ]
-    except:
-        content['testimonials'] = []
-    
-    # FAQ Section
-    try:
-        faq_section = FAQSection.objects.filter(is_active=True).first()
-        if faq_section:
-            content['faq_section'] = {
-                'title': faq_section.title,
-                'subtitle': faq_section.subtitle,
-                'description': faq_section.description,
-                **faq_section.content,
-            }
-    except:
-        content['faq_section'] = {}
-    
-    # FAQs
-    try:
-        faqs = FAQ.objects.filter(is_active=True).order_by('sort_order', 'id')
-        content['faqs'] = [
-            {
-                'question': faq.question,
-                'answer': faq.answer,
-                'category': faq.category,
-            }
-            for faq in faqs
-        ]
-    except:
-        content['faqs'] = []
-    
-    # Contact
-    try:
-        contact = Contact.objects.filter(is_active=True).first()
-        if contact:
-            content['contact'] = {
-                'cta_title': contact.cta_title,
-                'cta_subtitle': contact.cta_subtitle,
-                'cta_description': contact.cta_description,
-                'cta_quote': contact.cta_quote,
-                'cta_button1_text': contact.cta_button1_text,
-                'cta_button1_url': contact.cta_button1_url,
-                'cta_button2_text': contact.cta_button2_text,
-                'cta_button2_url': contact.cta_button2_url,
-                'cta_button3_text': contact.cta_button3_text,
-                'cta_button3_url': contact.cta_button3_url,
-                'title': contact.title,
-                'subtitle': contact.subtitle,
-                'description': contact.description,
-                **contact.content,
-            }
-    except:
-        content['contact'] = {}
-    
-    # Contact Info
-    try:
-        contact_infos = ContactInfo.objects.filter(is_active=True).order_by('sort_order', 'id')
-        content['contact_info'] = [
-            {
-                'type': info.type,
-                'label': info.label,
-                'value': info.value,
-                'icon': info.icon,
-            }
-            for info in contact_infos
-        ]
-    except:
-        content['contact_info'] = []
-    
-    # Contact Form Fields
-    try:
-        form_fields = ContactFormField.objects.filter(is_active=True).order_by('sort_order', 'id')
-        content['contact_form_fields'] = [
-            {
-                'label': field.label,
-                'field_type': field.field_type,
-                'placeholder': field.placeholder,
-                'is_required': field.is_required,
-                'options': field.options,
-            }
-            for field in form_fields
-        ]
-    except:
-        content['contact_form_fields'] = []
-    
-    # Social Links
-    try:
-        social_links = SocialLink.objects.filter(is_active=True).order_by('sort_order', 'id')
-        content['social_links'] = [
-            {
-                'platform': link.platform,
-                'label': link.label,
-                'url': link.url,
-                'icon': link.icon,
-            }
-            for link in social_links
-        ]
-    except:
-        content['social_links'] = []
-    
-    # Footer
-    try:
-        footer = Footer.objects.filter(is_active=True).first()
-        if footer:
-            content['footer'] = {
-                'copyright_text': footer.copyright_text,
-                **footer.content,
-            }
-    except:
-        content['footer'] = {
-            'copyright_text': '© 2025 All rights reserved.'
-        }
-    
-    # Decades Section
-    try:
-        decades_section = DecadesSection.objects.filter(is_active=True).first()
-        if decades_section:
-            content['decades_section'] = {
-                'title': decades_section.title,
-                'subtitle': decades_section.subtitle,
-                'description': decades_section.description,
-                'closing_quote': decades_section.closing_quote,
-                **decades_section.content,
-            }
-    except:
-        content['decades_section'] = {}
-    
-    # Decades Timeline Items
-    try:
-        timeline_items = DecadesTimelineItem.objects.filter(is_active=True).order_by('sort_order', 'id')
-        content['decades_timeline_items'] = [
-            {
-                'period': item.period,
-                'title': item.title,
-                'organization': item.organization,
-                'description': item.description,
-                'reflection': item.reflection,
-                'image_url': item.image_url,
-                'icon': item.icon,
-            }
-            for item in timeline_items
-        ]
-    except:
-        content['decades_timeline_items'] = []
-    
-    # Lion Section
-    try:
-        lion_section = LionSection.objects.filter(is_active=True).first()
-        if lion_section:
-            content['lion_section'] = {
-                'title': lion_section.title,
-                'icon': lion_section.icon,
-                'intro_text': lion_section.intro_text,
-                'paragraph_1': lion_section.paragraph_1,
-                'paragraph_2': lion_section.paragraph_2,
-                'reflection_question': lion_section.reflection_question,
-                'background_image_url': lion_section.background_image_url,
-                'book_cover_image_url': lion_section.book_cover_image_url,
-                'closing_quote': lion_section.closing_quote,
-                **lion_section.content,
-            }
-    except:
-        content['lion_section'] = {}
-    
-    # Books Section
-    try:
-        books_section = BooksSection.objects.filter(is_active=True).first()
-        if books_section:
-            content['books_section'] = {
-                'title': books_section.title,
-                'subtitle': books_section.subtitle,
-                'description': books_section.description,
-                'show_publishing_service': books_section.show_publishing_service,
-                'publishing_service_title': books_section.publishing_service_title,
-                'publishing_service_description': books_section.publishing_service_description,
-                'publishing_service_button_text': books_section.publishing_service_button_text,
-                'publishing_service_button_url': books_section.publishing_service_button_url,
-                **books_section.content,
-            }
-    except:
-        content['books_section'] = {}
-    
-    # Published Books
-    try:
-        published_books = PublishedBook.objects.filter(is_active=True).order_by('sort_order', 'id')
-        content['published_books'] = [
-            {
-                'title': book.title,
-                'subtitle': book.subtitle,
-                'description': book.description,
-                'cover_image_url': book.cover_image_url,
-                'publisher': book.publisher,
-                'publication_year': book.publication_year,
-                'purchase_url': book.purchase_url,
-                'amazon_url': book.amazon_url,
-            }
-            for book in published_books
-        ]
-    except:
-        content['published_books'] = []
-    
+    for key, loader in SECTION_LOADERS.items():
+        value = loader()
+        if value is not None:
+            content[key] = value
     return content
 
 
+class LazyHomepageContent(Mapping):
+    """
+    Homepage content that queries each section on first access.
+
+    Templates look up ``content.<section>`` as a dictionary key, so only the
+    sections the rendered partials actually reference are ever queried.
+    Loaded values are memoized for the lifetime of the object (one request).
+    """
+
+    def __init__(self, sections=None, loaders=SECTION_LOADERS, version=None):
+        # Section key -> value, or None for a section without an active row
+        self._sections = dict(sections or {})
+        self._loaders = loaders
+        self.version = version
+        self.loaded_keys = set()
+
+    def _load(self, key):
+        if key not in self._sections:
+            loader = self._loaders.get(key)
+            if loader is None:
+                raise KeyError(key)
+            self._sections[key] = loader()
+            self.loaded_keys.add(key)
+        return self._sections[key]
+
+    def __getitem__(self, key):
+        value = self._load(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        for key in self._loaders:
+            if self._load(key) is not None:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    @property
+    def sections(self):
+        """Sections resolved so far, including ones without an active row"""
+        return dict(self._sections)
@@ -13,6 +13,9 @@ urlpatterns = [
     
     # Dashboard Home
     path('', dashboard_views.dashboard_home, name='index'),
+    path('publish/', dashboard_views.publish, name='publish'),
+    path('chat-status/', dashboard_views.chat_status, name='chat_status'),
+    path('chat-telemetry/', dashboard_views.chat_telemetry, name='chat_telemetry'),
     
     # Image Upload & Gallery
     path('gallery/', dashboard_views.gallery, name='gallery'),
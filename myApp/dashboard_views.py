@@ -9,6 +9,9 @@ from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from datetime import timedelta
 import json
 import os
 
@@ -16,9 +19,16 @@ from .models import (
     MediaAsset, SEO, Navigation, Hero, About, Stat, Service, ServicesSection,
     Portfolio, PortfolioProject, Testimonial, FAQ, FAQSection, Contact,
     ContactInfo, ContactFormField, SocialLink, Footer, DecadesSection, DecadesTimelineItem,
-    LionSection
+    LionSection, ChatCall
 )
-from .utils.cloudinary_utils import upload_to_cloudinary
+from .utils.cloudinary_utils import file_sha256, upload_many
+from .utils.openai_client import get_stats as get_openai_stats
+from .utils.rate_limit import get_stats as get_rate_limit_stats
+from .utils.response_cache import get_stats as get_response_cache_stats
+from .utils.single_flight import get_stats as get_single_flight_stats
+from .utils.telemetry import get_stats as get_telemetry_stats, summarize as summarize_chat_calls
+from .publishing import publish_homepage
+from .singletons import get_singleton
 
 
 # Authentication Views
@@ -65,6 +75,78 @@ def dashboard_home(request):
     return render(request, 'dashboard/index.html', context)
 
 
+@login_required
+@require_http_methods(["POST"])
+def publish(request):
+    """Publish a static export of the homepage"""
+    try:
+        manifest = publish_homepage()
+        messages.success(request, f'Homepage published in {manifest["render_ms"]} ms!')
+    except Exception as e:
+        messages.error(request, f'Publishing failed: {str(e)}')
+    return redirect('dashboard:index')
+
+
+@login_required
+def chat_status(request):
+    """
+    Circuit breaker state, OpenAI call, response cache and coalescing
+    counters for this worker process, and the chats in flight across all
+    workers
+    """
+    return JsonResponse(dict(
+        get_openai_stats(),
+        response_cache=get_response_cache_stats(),
+        rate_limit=get_rate_limit_stats(),
+        single_flight=get_single_flight_stats(),
+        telemetry=get_telemetry_stats(),
+    ))
+
+
+CHAT_TELEMETRY_WINDOWS = (
+    ('Last hour', timedelta(hours=1)),
+    ('Last 24 hours', timedelta(days=1)),
+    ('Last 7 days', timedelta(days=7)),
+)
+
+CHAT_CALL_FIELDS = (
+    'created_at', 'source', 'outcome', 'error', 'total_ms', 'queue_ms', 'upstream_ms', 'ttft_ms',
+    'prompt_tokens', 'completion_tokens',
+)
+
+
+@login_required
+def chat_telemetry(request):
+    """Chat latency percentiles, error rates and tokens over time windows, and hour by hour for the last day"""
+    now = timezone.now()
+    rows = list(
+        ChatCall.objects.filter(created_at__gte=now - CHAT_TELEMETRY_WINDOWS[-1][1]).values(*CHAT_CALL_FIELDS)
+    )
+
+    windows = [
+        (label, summarize_chat_calls(row for row in rows if row['created_at'] >= now - span))
+        for label, span in CHAT_TELEMETRY_WINDOWS
+    ]
+
+    hours = []
+    next_hour = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    for hours_ago in range(24, 0, -1):
+        start = next_hour - timedelta(hours=hours_ago)
+        end = start + timedelta(hours=1)
+        hours.append((
+            timezone.localtime(start),
+            summarize_chat_calls(row for row in rows if start <= row['created_at'] < end),
+        ))
+
+    context = {
+        'windows': windows,
+        'hours': hours,
+        'recent_errors': [row for row in rows if row['outcome'] != 'ok'][:20],
+        'telemetry': get_telemetry_stats(),
+    }
+    return render(request, 'dashboard/chat_telemetry.html', context)
+
+
 # Image Upload and Gallery
 @login_required
 @csrf_exempt
@@ -114,44 +196,78 @@ def upload_image(request):
         uploaded_images = []
         errors = []
         
-        # Process each image
-        for idx, image_file in enumerate(image_files):
+        # Files already in the library (same SHA-256, see upload_handlers.py) are not uploaded again
+        hashes = [file_sha256(image_file) for image_file in image_files]
+        existing_assets = {asset.sha256: asset for asset in MediaAsset.objects.filter(sha256__in=hashes)}
+        
+        # Assets added before hashing have no sha256: match those by file name instead,
+        # and record the hash so later uploads find them by content
+        names = {
+            sha256: image_file.name.rsplit('.', 1)[0]
+            for image_file, sha256 in zip(image_files, hashes)
+            if sha256 not in existing_assets
+        }
+        legacy_assets = {
+            asset.title: asset
+            for asset in MediaAsset.objects.filter(sha256__isnull=True, title__in=names.values())
+        }
+        for sha256, name in names.items():
+            asset = legacy_assets.pop(name, None)
+            if asset is None:
+                continue
+            asset.sha256 = sha256
             try:
-                # Use provided title/description for first image, or filename for others
-                title = default_title if idx == 0 and default_title else image_file.name.rsplit('.', 1)[0]
-                description = default_description if idx == 0 else ''
-                
-                # Upload to Cloudinary
-                upload_result = upload_to_cloudinary(image_file, folder=folder)
-                
-                # Check if image already exists (prevent duplicates)
-                public_id = upload_result['public_id']
-                existing_asset = MediaAsset.objects.filter(cloudinary_public_id=public_id).first()
-                
-                if existing_asset:
-                    # Image already exists, skip creating duplicate
-                    uploaded_images.append({
-                        'id': existing_asset.id,
-                        'title': existing_asset.title,
-                        'original_url': existing_asset.original_url,
-                        'web_url': existing_asset.web_url,
-                        'thumbnail_url': existing_asset.thumbnail_url,
-                    })
-                    continue
+                with transaction.atomic():
+                    asset.save(update_fields=['sha256'])
+            except IntegrityError:
+                # The same file was saved by another upload in the meantime
+                asset = MediaAsset.objects.get(sha256=sha256)
+            existing_assets[sha256] = asset
+        
+        # Each new file is uploaded once, even when it was picked twice
+        new_files = {}
+        for image_file, sha256 in zip(image_files, hashes):
+            if sha256 not in existing_assets:
+                new_files.setdefault(sha256, image_file)
+        
+        # Upload IMAGE_UPLOAD_MAX_WORKERS files at a time, each within IMAGE_UPLOAD_TIMEOUT
+        upload_results = dict(zip(new_files, upload_many(list(new_files.values()), folder=folder)))
+        
+        # Save each uploaded image, in the order the files were sent
+        for idx, (image_file, sha256) in enumerate(zip(image_files, hashes)):
+            try:
+                media_asset = existing_assets.get(sha256)
+                is_duplicate = media_asset is not None
                 
-                # Save to database
-                media_asset = MediaAsset.objects.create(
-                    title=title,
-                    description=description,
-                    original_url=upload_result['original_url'],
-                    web_url=upload_result['web_url'],
-                    thumbnail_url=upload_result['thumbnail_url'],
-                    cloudinary_public_id=public_id,
-                    folder=folder,
-                    width=upload_result['width'],
-                    height=upload_result['height'],
-                    file_size=upload_result['bytes'],
-                )
+                if not is_duplicate:
+                    upload_result = upload_results[sha256]
+                    if isinstance(upload_result, Exception):
+                        raise upload_result
+                    
+                    # Use provided title/description for first image, or filename for others
+                    title = default_title if idx == 0 and default_title else image_file.name.rsplit('.', 1)[0]
+                    description = default_description if idx == 0 else ''
+                    
+                    # Save to database
+                    try:
+                        with transaction.atomic():
+                            media_asset = MediaAsset.objects.create(
+                                title=title,
+                                description=description,
+                                original_url=upload_result['original_url'],
+                                web_url=upload_result['web_url'],
+                                thumbnail_url=upload_result['thumbnail_url'],
+                                cloudinary_public_id=upload_result['public_id'],
+                                folder=folder,
+                                width=upload_result['width'],
+                                height=upload_result['height'],
+                                file_size=upload_result['bytes'],
+                                sha256=sha256,
+                            )
+                    except IntegrityError:
+                        # The same file was saved by another upload in the meantime
+                        media_asset = MediaAsset.objects.get(sha256=sha256)
+                    existing_assets[sha256] = media_asset
                 
                 uploaded_images.append({
                     'id': media_asset.id,
@@ -159,6 +275,7 @@ def upload_image(request):
                     'original_url': media_asset.original_url,
                     'web_url': media_asset.web_url,
                     'thumbnail_url': media_asset.thumbnail_url,
+                    'duplicate': is_duplicate,
                 })
             except Exception as e:
                 import traceback
@@ -238,7 +355,7 @@ def gallery(request):
 @login_required
 def seo_edit(request):
     """Edit SEO settings"""
-    seo, created = SEO.objects.get_or_create(pk=1)
+    seo = get_singleton(SEO)
     
     if request.method == 'POST':
         seo.page_title = request.POST.get('page_title', '')
@@ -297,7 +414,7 @@ def navigation_edit(request):
 @login_required
 def hero_edit(request):
     """Edit hero section"""
-    hero, created = Hero.objects.get_or_create(pk=1)
+    hero = get_singleton(Hero)
     
     if request.method == 'POST':
         hero.title = request.POST.get('title', '')
@@ -327,7 +444,7 @@ def hero_edit(request):
 @login_required
 def about_edit(request):
     """Edit about section"""
-    about, created = About.objects.get_or_create(pk=1)
+    about = get_singleton(About)
     
     if request.method == 'POST':
         about.title = request.POST.get('title', '')
@@ -443,7 +560,7 @@ def service_edit(request, service_id=None):
 @login_required
 def services_section_edit(request):
     """Edit services section"""
-    section, created = ServicesSection.objects.get_or_create(pk=1)
+    section = get_singleton(ServicesSection)
     
     if request.method == 'POST':
         section.title = request.POST.get('title', '')
@@ -469,7 +586,7 @@ def services_section_edit(request):
 @login_required
 def portfolio_edit(request):
     """Edit portfolio section"""
-    portfolio, created = Portfolio.objects.get_or_create(pk=1)
+    portfolio = get_singleton(Portfolio)
     
     if request.method == 'POST':
         portfolio.title = request.POST.get('title', '')
@@ -625,7 +742,7 @@ def faq_edit(request, faq_id=None):
 @login_required
 def faq_section_edit(request):
     """Edit FAQ section"""
-    section, created = FAQSection.objects.get_or_create(pk=1)
+    section = get_singleton(FAQSection)
     
     if request.method == 'POST':
         section.title = request.POST.get('title', '')
@@ -651,7 +768,7 @@ def faq_section_edit(request):
 @login_required
 def cta_edit(request):
     """Edit Call To Action section (upper dark section)"""
-    contact, created = Contact.objects.get_or_create(pk=1)
+    contact = get_singleton(Contact)
     
     if request.method == 'POST':
         contact.cta_title = request.POST.get('cta_title', '')
@@ -679,7 +796,7 @@ def cta_edit(request):
 @login_required
 def contact_edit(request):
     """Edit contact section (lower white section)"""
-    contact, created = Contact.objects.get_or_create(pk=1)
+    contact = get_singleton(Contact)
     
     if request.method == 'POST':
         # Contact Section (Lower White Section)
@@ -842,7 +959,7 @@ def social_link_edit(request, link_id=None):
 @login_required
 def footer_edit(request):
     """Edit footer"""
-    footer, created = Footer.objects.get_or_create(pk=1)
+    footer = get_singleton(Footer)
     
     if request.method == 'POST':
         footer.copyright_text = request.POST.get('copyright_text', '')
@@ -866,7 +983,7 @@ def footer_edit(request):
 @login_required
 def decades_section_edit(request):
     """Edit Decades of Walking With Leaders section"""
-    section, created = DecadesSection.objects.get_or_create(pk=1)
+    section = get_singleton(DecadesSection)
     
     if request.method == 'POST':
         section.title = request.POST.get('title', '')
@@ -926,7 +1043,7 @@ def decades_timeline_item_edit(request, item_id=None):
         item.is_active = request.POST.get('is_active') == 'on'
         
         # Link to section if it exists
-        section, _ = DecadesSection.objects.get_or_create(pk=1)
+        section = get_singleton(DecadesSection)
         item.section = section
         
         item.save()
@@ -941,7 +1058,7 @@ def decades_timeline_item_edit(request, item_id=None):
 @login_required
 def lion_section_edit(request):
     """Edit The Lion You Don't See section"""
-    section, created = LionSection.objects.get_or_create(pk=1)
+    section = get_singleton(LionSection)
     
     if request.method == 'POST':
         section.title = request.POST.get('title', '')
@@ -0,0 +1,143 @@
+"""
+Management command to benchmark concurrent chats on one ASGI worker
+Usage: python manage.py bench_chat_concurrency [--chats 50] [--delay 2.0] [--probes 20] [--stream]
+
+Starts the fake OpenAI upstream (myApp/utils/fake_openai.py) in-process,
+points OPENAI_BASE_URL at it, and drives myProject.asgi.application on a
+single event loop - one worker. The homepage is probed on its own, then
+again while --chats chat requests are held open by the upstream delay.
+"""
+import asyncio
+import threading
+import time
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from myApp.utils.fake_openai import FakeOpenAIServer
+from myApp.utils.telemetry import percentile
+
+
+def summarize(latencies):
+    """p50 / p95 / max of a list of latencies, in ms"""
+    return percentile(latencies, 0.5) * 1000, percentile(latencies, 0.95) * 1000, max(latencies) * 1000
+
+
+class Command(BaseCommand):
+    help = 'Measure how many chats one ASGI worker holds open while the homepage latency stays flat'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chats',
+            type=int,
+            default=50,
+            help='Concurrent chat requests (default: 50)',
+        )
+        parser.add_argument(
+            '--delay',
+            type=float,
+            default=2.0,
+            help='Seconds the fake upstream takes to answer (default: 2.0)',
+        )
+        parser.add_argument(
+            '--probes',
+            type=int,
+            default=20,
+            help='Homepage requests per measurement (default: 20)',
+        )
+        parser.add_argument(
+            '--stream',
+            action='store_true',
+            help='Request streamed (Server-Sent Events) replies',
+        )
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run(options))
+
+    async def run(self, options):
+        upstream = await FakeOpenAIServer(delay=options['delay']).start()
+        try:
+            # Throttling (see bench_chat_rate_limit) and coalescing (see bench_chat_single_flight)
+            # are lifted: every chat should reach the upstream
+            with override_settings(
+                OPENAI_API_KEY='sk-fake', OPENAI_BASE_URL=upstream.base_url,
+                CHAT_RATE_LIMIT_BURST=options['chats'], CHAT_MAX_IN_FLIGHT=options['chats'],
+                CHAT_SINGLE_FLIGHT_ENABLED=False,
+            ):
+                from myProject.asgi import application
+
+                transport = httpx.ASGITransport(app=application)
+                async with httpx.AsyncClient(
+                    transport=transport,
+                    base_url=f'http://{settings.ALLOWED_HOSTS[0]}',
+                    timeout=options['delay'] * 10 + 30,
+                ) as client:
+                    await self.benchmark(client, upstream, options)
+        finally:
+            await upstream.close()
+
+    async def probe_homepage(self, client, probes):
+        latencies = []
+        for _ in range(probes):
+            started = time.perf_counter()
+            response = await client.get('/')
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.status_code
+            await asyncio.sleep(0.05)
+        return latencies
+
+    async def chat(self, client, stream):
+        started = time.perf_counter()
+        response = await client.post('/api/chat/', json={
+            'message': 'I lead a team and I feel like I am carrying everyone.',
+            'history': [],
+            'stream': stream,
+        })
+        elapsed = time.perf_counter() - started
+        if stream:
+            ok = response.status_code == 200 and '"done": true' in response.text
+        else:
+            ok = response.status_code == 200 and response.json().get('success')
+        return ok, elapsed
+
+    async def benchmark(self, client, upstream, options):
+        chats, probes = options['chats'], options['probes']
+        await client.get('/')  # Warm the homepage caches
+
+        idle = await self.probe_homepage(client, probes)
+
+        threads_before = threading.active_count()
+        started = time.perf_counter()
+        chat_tasks = [asyncio.create_task(self.chat(client, options['stream'])) for _ in range(chats)]
+        # Let the chats reach the upstream before probing
+        while upstream.in_flight < chats and time.perf_counter() - started < options['delay']:
+            await asyncio.sleep(0.01)
+        loaded = await self.probe_homepage(client, probes)
+        results = await asyncio.gather(*chat_tasks)
+        wall = time.perf_counter() - started
+        threads_peak = threading.active_count()
+
+        succeeded = sum(1 for ok, _ in results if ok)
+        chat_latencies = [elapsed for _, elapsed in results]
+
+        self.stdout.write('')
+        self.stdout.write(f'Chats: {succeeded}/{chats} succeeded, upstream delay {options["delay"]}s, '
+                          f'{"streamed" if options["stream"] else "JSON"} replies')
+        self.stdout.write(f'Held open at once by the upstream: {upstream.max_in_flight}')
+        self.stdout.write(f'All chats finished in {wall:.2f}s '
+                          f'(serially this would take {chats * options["delay"]:.0f}s)')
+        p50, p95, worst = summarize(chat_latencies)
+        self.stdout.write(f'Chat latency ms: p50 {p50:.0f}  p95 {p95:.0f}  max {worst:.0f}')
+        self.stdout.write(f'Threads: {threads_before} before, {threads_peak} after')
+        self.stdout.write('')
+        self.stdout.write(f'{"homepage":<20}{"p50 ms":>10}{"p95 ms":>10}{"max ms":>10}')
+        for label, latencies in (('idle', idle), (f'{chats} chats open', loaded)):
+            p50, p95, worst = summarize(latencies)
+            self.stdout.write(f'{label:<20}{p50:>10.1f}{p95:>10.1f}{worst:>10.1f}')
+
+        if succeeded == chats:
+            self.stdout.write(self.style.SUCCESS('Every chat completed on a single worker.'))
+        else:
+            self.stdout.write(self.style.ERROR(f'{chats - succeeded} chats failed.'))
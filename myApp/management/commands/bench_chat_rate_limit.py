@@ -0,0 +1,153 @@
+"""
+Management command to load test the chat throttling
+Usage: python manage.py bench_chat_rate_limit [--clients 10] [--requests 20] [--max-in-flight 20] [--delay 2.0]
+
+Starts the fake OpenAI upstream (myApp/utils/fake_openai.py) in-process and
+drives myProject.asgi.application on one event loop. --clients scripts, each
+from its own IP, fire --requests chats at once while the homepage is
+probed. Reports how many chats were admitted, rate limited (per-client
+token bucket) or shed (in-flight cap), the most chats the upstream saw at
+once, and the homepage latency idle and under the flood.
+"""
+import asyncio
+import time
+from collections import Counter
+
+import httpx
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from myApp.utils.fake_openai import FakeOpenAIServer
+from myApp.utils.rate_limit import BUSY_MESSAGE
+
+from .bench_chat_concurrency import summarize
+
+
+class Command(BaseCommand):
+    help = 'Flood the chat endpoint from several clients and check that it sheds load while the homepage stays fast'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clients',
+            type=int,
+            default=10,
+            help='Clients, each with its own IP (default: 10)',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=20,
+            help='Chats each client fires at once (default: 20)',
+        )
+        parser.add_argument(
+            '--max-in-flight',
+            type=int,
+            default=20,
+            help='CHAT_MAX_IN_FLIGHT for the run (default: 20)',
+        )
+        parser.add_argument(
+            '--delay',
+            type=float,
+            default=2.0,
+            help='Seconds the fake upstream takes to answer (default: 2.0)',
+        )
+        parser.add_argument(
+            '--probes',
+            type=int,
+            default=20,
+            help='Homepage requests per measurement (default: 20)',
+        )
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run(options))
+
+    async def run(self, options):
+        upstream = await FakeOpenAIServer(delay=options['delay']).start()
+        try:
+            # Every chat sends the same message: keep them from being coalesced (see bench_chat_single_flight)
+            with override_settings(
+                OPENAI_API_KEY='sk-fake', OPENAI_BASE_URL=upstream.base_url,
+                CHAT_MAX_IN_FLIGHT=options['max_in_flight'], CHAT_SINGLE_FLIGHT_ENABLED=False,
+            ):
+                await cache.aclear()  # Start with full buckets and free slots
+                from myProject.asgi import application
+
+                clients = [
+                    httpx.AsyncClient(
+                        transport=httpx.ASGITransport(app=application, client=(f'10.0.0.{i + 1}', 40000)),
+                        base_url=f'http://{settings.ALLOWED_HOSTS[0]}',
+                        timeout=options['delay'] * 10 + 30,
+                    )
+                    for i in range(options['clients'] + 1)
+                ]
+                try:
+                    # The last client only browses the homepage
+                    await self.benchmark(clients[:-1], clients[-1], upstream, options)
+                finally:
+                    for client in clients:
+                        await client.aclose()
+        finally:
+            await upstream.close()
+
+    async def probe_homepage(self, client, probes):
+        latencies = []
+        for _ in range(probes):
+            started = time.perf_counter()
+            response = await client.get('/')
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.status_code
+            await asyncio.sleep(0.05)
+        return latencies
+
+    async def chat(self, client):
+        started = time.perf_counter()
+        response = await client.post('/api/chat/', json={
+            'message': 'I lead a team and I feel like I am carrying everyone.',
+        })
+        elapsed = time.perf_counter() - started
+        if response.status_code == 429:
+            outcome = 'shed (in-flight cap)' if response.json().get('error') == BUSY_MESSAGE else 'rate limited'
+            assert 'retry-after' in response.headers
+        elif response.status_code == 200:
+            outcome = 'answered'
+        else:
+            outcome = f'HTTP {response.status_code}'
+        return outcome, elapsed
+
+    async def benchmark(self, chat_clients, browser, upstream, options):
+        await browser.get('/')  # Warm the homepage caches
+        idle = await self.probe_homepage(browser, options['probes'])
+
+        started = time.perf_counter()
+        chat_tasks = [
+            asyncio.create_task(self.chat(client))
+            for client in chat_clients for _ in range(options['requests'])
+        ]
+        loaded = await self.probe_homepage(browser, options['probes'])
+        results = await asyncio.gather(*chat_tasks)
+        wall = time.perf_counter() - started
+
+        outcomes = Counter(outcome for outcome, _ in results)
+        self.stdout.write('')
+        self.stdout.write(
+            f'{len(results)} chats from {len(chat_clients)} clients in {wall:.2f}s, '
+            f'burst {settings.CHAT_RATE_LIMIT_BURST} per client, '
+            f'at most {options["max_in_flight"]} in flight, upstream delay {options["delay"]}s'
+        )
+        for outcome, count in outcomes.most_common():
+            latencies = [elapsed for result, elapsed in results if result == outcome]
+            p50, p95, _ = summarize(latencies)
+            self.stdout.write(f'  {outcome:<22}{count:>6}   p50 {p50:.0f} ms, p95 {p95:.0f} ms')
+        self.stdout.write(f'Held open at once by the upstream: {upstream.max_in_flight}')
+        self.stdout.write('')
+        self.stdout.write(f'{"homepage":<20}{"p50 ms":>10}{"p95 ms":>10}{"max ms":>10}')
+        for label, latencies in (('idle', idle), ('chat flood', loaded)):
+            p50, p95, worst = summarize(latencies)
+            self.stdout.write(f'{label:<20}{p50:>10.1f}{p95:>10.1f}{worst:>10.1f}')
+
+        if upstream.max_in_flight <= options['max_in_flight']:
+            self.stdout.write(self.style.SUCCESS('The upstream never saw more chats than the in-flight cap.'))
+        else:
+            self.stdout.write(self.style.ERROR('The in-flight cap was exceeded.'))
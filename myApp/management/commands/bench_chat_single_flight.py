@@ -0,0 +1,122 @@
+"""
+Management command to benchmark single-flight coalescing of chat openers
+Usage: python manage.py bench_chat_single_flight [--requests 100] [--openers 3] [--delay 1.0] [--stream]
+
+Starts the fake OpenAI upstream (myApp/utils/fake_openai.py) in-process and
+drives myProject.asgi.application on one event loop. A burst of --requests
+new chats, spread over --openers suggested opening messages, is sent twice:
+with CHAT_SINGLE_FLIGHT_ENABLED off, then on. Reports the upstream calls and
+the chat latency of each run.
+"""
+import asyncio
+import time
+from collections import Counter
+
+import httpx
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from myApp.utils.fake_openai import FakeOpenAIServer
+
+from .bench_chat_concurrency import summarize
+
+OPENERS = (
+    'Who are you?',
+    'What would you ask a leader who feels alone?',
+    'Where do leaders go when they need support?',
+    'What does it mean to lead while fully human?',
+    'How do I find the courage to speak up?',
+)
+
+
+class Command(BaseCommand):
+    help = 'Compare upstream calls for a burst of identical chat openers with and without single-flight coalescing'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=100,
+            help='New chats in the burst (default: 100)',
+        )
+        parser.add_argument(
+            '--openers',
+            type=int,
+            default=3,
+            choices=range(1, len(OPENERS) + 1),
+            help=f'Different opening messages in the burst (default: 3, at most {len(OPENERS)})',
+        )
+        parser.add_argument(
+            '--delay',
+            type=float,
+            default=1.0,
+            help='Seconds the fake upstream takes to answer (default: 1.0)',
+        )
+        parser.add_argument(
+            '--stream',
+            action='store_true',
+            help='Request streamed (Server-Sent Events) replies',
+        )
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run(options))
+
+    async def run(self, options):
+        upstream = await FakeOpenAIServer(delay=options['delay']).start()
+        try:
+            # Throttling (see bench_chat_rate_limit) is lifted: the burst is all one client
+            with override_settings(
+                OPENAI_API_KEY='sk-fake', OPENAI_BASE_URL=upstream.base_url,
+                CHAT_RATE_LIMIT_BURST=options['requests'] * 2, CHAT_MAX_IN_FLIGHT=options['requests'],
+                CHAT_RESPONSE_CACHE_ENABLED=False,
+            ):
+                from myProject.asgi import application
+
+                async with httpx.AsyncClient(
+                    transport=httpx.ASGITransport(app=application),
+                    base_url=f'http://{settings.ALLOWED_HOSTS[0]}',
+                    timeout=options['delay'] * 10 + 30,
+                ) as client:
+                    rows = []
+                    for enabled in (False, True):
+                        with override_settings(CHAT_SINGLE_FLIGHT_ENABLED=enabled):
+                            rows.append((enabled, await self.burst(client, upstream, options)))
+        finally:
+            await upstream.close()
+
+        self.stdout.write('')
+        self.stdout.write(
+            f'{options["requests"]} new chats over {options["openers"]} openers, '
+            f'upstream delay {options["delay"]}s, {"streamed" if options["stream"] else "JSON"} replies'
+        )
+        self.stdout.write('')
+        self.stdout.write(f'{"single flight":<16}{"upstream calls":>16}{"p50 ms":>10}{"p95 ms":>10}  sources')
+        for enabled, (calls, latencies, sources) in rows:
+            p50, p95, _ = summarize(latencies)
+            sources = ', '.join(f'{source} {count}' for source, count in sources.most_common())
+            self.stdout.write(f'{"on" if enabled else "off":<16}{calls:>16}{p50:>10.0f}{p95:>10.0f}  {sources}')
+
+        calls_off, calls_on = rows[0][1][0], rows[1][1][0]
+        self.stdout.write(self.style.SUCCESS(
+            f'Upstream calls: {calls_off} -> {calls_on} ({1 - calls_on / calls_off:.0%} fewer)'
+        ))
+
+    async def chat(self, client, message, stream):
+        started = time.perf_counter()
+        response = await client.post('/api/chat/', json={'message': message, 'stream': stream})
+        elapsed = time.perf_counter() - started
+        assert response.status_code == 200, response.status_code
+        return response.headers.get('x-chat-source'), elapsed
+
+    async def burst(self, client, upstream, options):
+        await cache.aclear()  # Full rate-limit buckets, no results left from the previous run
+        before = upstream.requests
+        openers = OPENERS[:options['openers']]
+        results = await asyncio.gather(*(
+            self.chat(client, openers[i % len(openers)], options['stream'])
+            for i in range(options['requests'])
+        ))
+        sources = Counter(source for source, _ in results)
+        return upstream.requests - before, [elapsed for _, elapsed in results], sources
@@ -0,0 +1,107 @@
+"""
+Management command to benchmark the homepage list queries with and without
+the partial (sort_order, id) WHERE is_active indexes
+Usage: python manage.py bench_content_indexes [--rows 10000] [--repeat 20]
+
+Everything runs against a scratch database created like the test runner's
+(test_<NAME>, in memory on SQLite) and destroyed afterwards, never the
+configured one: rows are seeded, each list query is explained and timed,
+the indexes are dropped, and the queries are explained and timed again.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.test.utils import setup_databases, teardown_databases
+
+from myApp.content_helpers import SECTION_SPECS, load_section
+from myApp.management.commands.bench_content_loader import Command as LoaderBenchmark
+
+
+def list_queryset(spec):
+    """The queryset load_section runs for a list section"""
+    return (
+        spec.model.objects.filter(is_active=True)
+        .order_by(*spec.ordering)
+        .values(*spec.columns)
+    )
+
+
+def explain(queryset, tag):
+    """
+    EXPLAIN the queryset. The SQL is tagged with a comment because SQLite's
+    statement cache would otherwise replay the first plan after DROP INDEX.
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'{connection.ops.explain_query_prefix()} {sql} /* {tag} */', params)
+        return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+
+
+class Command(BaseCommand):
+    help = 'Show query plans and timings for the homepage list queries with and without their indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=10000,
+            help='Rows to seed into each list section (default: 10000)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Timed runs per query (default: 20)',
+        )
+
+    def handle(self, *args, **options):
+        specs = [spec for spec in SECTION_SPECS if spec.many]
+        old_config = setup_databases(
+            verbosity=options['verbosity'], interactive=False,
+            aliases={DEFAULT_DB_ALIAS}, serialized_aliases=set(),
+        )
+        try:
+            LoaderBenchmark(stdout=self.stdout).seed(options['rows'])
+            # Deactivate a third of the rows so the is_active filter matters
+            for spec in specs:
+                spec.model.objects.filter(id__in=list(
+                    spec.model.objects.values_list('id', flat=True)[::3]
+                )).update(is_active=False)
+
+            with_indexes = self.run(specs, options['repeat'], 'With indexes')
+            self.drop_indexes(specs)
+            without_indexes = self.run(specs, options['repeat'], 'Without indexes')
+        finally:
+            teardown_databases(old_config, verbosity=options['verbosity'])
+
+        self.stdout.write('')
+        self.stdout.write(f'{"section":<26}{"indexed ms":>12}{"no index ms":>14}{"speedup":>10}')
+        for spec in specs:
+            indexed, plain = with_indexes[spec.key], without_indexes[spec.key]
+            self.stdout.write(f'{spec.key:<26}{indexed:>12.2f}{plain:>14.2f}{plain / indexed:>9.1f}x')
+        self.stdout.write(self.style.SUCCESS('Scratch database destroyed; the configured database was not touched.'))
+
+    def drop_indexes(self, specs):
+        with connection.cursor() as cursor:
+            for spec in specs:
+                for index in spec.model._meta.indexes:
+                    cursor.execute(f'DROP INDEX {connection.ops.quote_name(index.name)}')
+
+    def run(self, specs, repeat, title):
+        self.stdout.write('')
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        timings = {}
+        for spec in specs:
+            self.stdout.write(f'{spec.key}:')
+            for line in explain(list_queryset(spec), title):
+                self.stdout.write(f'    {line}')
+
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                load_section(spec)
+                elapsed = (time.perf_counter() - started) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+            timings[spec.key] = best
+        return timings
@@ -0,0 +1,137 @@
+"""
+Management command to benchmark the homepage section loader
+Usage: python manage.py bench_content_loader [--rows 5000] [--repeat 5]
+
+Seeds extra rows into every list section inside a transaction that is rolled
+back afterwards, then compares the .values() loader (load_section) against
+building full model instances and copying fields by hand, as the loader did
+before the section specs.
+"""
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from myApp.content_helpers import SECTION_SPECS, load_section
+
+# Required fields that have no default, for seeding
+SEED_VALUES = {
+    'title': 'Benchmark title',
+    'label': 'Benchmark label',
+    'value': 'Benchmark value',
+    'question': 'Benchmark question?',
+    'answer': 'Benchmark answer ' * 20,
+    'name': 'Benchmark name',
+    'content': 'Benchmark testimonial ' * 20,
+    'url': 'https://example.com/',
+    'description': 'Benchmark description ' * 20,
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+def load_section_with_instances(spec):
+    """The pre-spec approach: full model instances, fields copied one by one"""
+    queryset = spec.model.objects.all()
+    if spec.active_only:
+        queryset = queryset.filter(is_active=True)
+    if spec.many:
+        rows = []
+        for obj in queryset.order_by(*spec.ordering):
+            row = {field: getattr(obj, field) for field in spec.fields}
+            if spec.merge_content:
+                row.update(obj.content)
+            rows.append(row)
+        return rows
+    obj = queryset.first()
+    if obj is None:
+        return None
+    row = {field: getattr(obj, field) for field in spec.fields}
+    if spec.merge_content:
+        row.update(obj.content)
+    return row
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the .values() section loader against model instances on large seeded tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=5000,
+            help='Rows to seed into each list section (default: 5000)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Timed runs per loader (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        repeat = options['repeat']
+
+        try:
+            with transaction.atomic():
+                self.seed(rows)
+                self.run(repeat)
+                raise Rollback
+        except Rollback:
+            self.stdout.write(self.style.SUCCESS('Seeded rows rolled back.'))
+
+    def seed(self, rows):
+        self.stdout.write(f'Seeding {rows} rows into each list section...')
+        for spec in SECTION_SPECS:
+            if not spec.many:
+                continue
+            field_names = {field.name for field in spec.model._meta.get_fields()}
+            values = {name: value for name, value in SEED_VALUES.items() if name in field_names}
+            if 'content' in values and spec.merge_content:
+                values['content'] = {'badge': 'Benchmark'}
+            spec.model.objects.bulk_create(
+                [spec.model(sort_order=i, **values) if 'sort_order' in field_names
+                 else spec.model(order=i, **values) for i in range(rows)],
+                batch_size=1000,
+            )
+
+    def measure(self, loader, repeat):
+        """Best wall time (ms) and peak traced memory (KB) over `repeat` runs"""
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for spec in SECTION_SPECS:
+                loader(spec)
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+
+        tracemalloc.start()
+        for spec in SECTION_SPECS:
+            loader(spec)
+        peak = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+        return best, peak
+
+    def run(self, repeat):
+        for spec in SECTION_SPECS:
+            assert load_section(spec) == load_section_with_instances(spec), spec.key
+
+        results = {
+            'model instances': self.measure(load_section_with_instances, repeat),
+            '.values()': self.measure(load_section, repeat),
+        }
+
+        self.stdout.write('')
+        self.stdout.write(f'{"loader":<18}{"best ms":>12}{"peak KB":>12}')
+        for name, (ms, peak) in results.items():
+            self.stdout.write(f'{name:<18}{ms:>12.1f}{peak:>12.0f}')
+        baseline_ms, baseline_peak = results['model instances']
+        values_ms, values_peak = results['.values()']
+        self.stdout.write(self.style.SUCCESS(
+            f'.values() loader: {baseline_ms / values_ms:.2f}x faster, '
+            f'{baseline_peak / values_peak:.2f}x less peak memory'
+        ))
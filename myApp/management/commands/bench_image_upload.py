@@ -0,0 +1,94 @@
+"""
+Management command to benchmark dashboard batch uploads
+Usage: python manage.py bench_image_upload [--batches 1 5 10 20] [--workers 1 4 8] [--delay 0.5] [--size 500]
+
+Starts the fake Cloudinary upload API (myApp/utils/fake_cloudinary.py)
+in-process, points the Cloudinary SDK at it, and uploads batches of
+--size KB files through upload_many - the path the dashboard's
+upload_image view takes - at each pool width. A width of 1 is the old
+one-file-after-another behaviour. Reports the wall time of every batch.
+"""
+import os
+import time
+
+import cloudinary
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+
+from myApp.utils.cloudinary_utils import upload_many
+from myApp.utils.fake_cloudinary import FakeCloudinaryServer
+
+
+class Command(BaseCommand):
+    help = 'Measure dashboard batch upload wall time by batch size and pool width against a local Cloudinary stand-in'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batches',
+            type=int,
+            nargs='+',
+            default=[1, 5, 10, 20],
+            help='Files per batch (default: 1 5 10 20)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            nargs='+',
+            default=[1, 4, 8],
+            help='Pool widths to compare; 1 uploads one file at a time (default: 1 4 8)',
+        )
+        parser.add_argument(
+            '--delay',
+            type=float,
+            default=0.5,
+            help='Seconds the fake Cloudinary takes per upload (default: 0.5)',
+        )
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=500,
+            help='Size of each file in KB (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        server = FakeCloudinaryServer(delay=options['delay']).start()
+        previous = {key: getattr(cloudinary.config(), key, None)
+                    for key in ('upload_prefix', 'cloud_name', 'api_key', 'api_secret')}
+        cloudinary.config(upload_prefix=server.upload_prefix, cloud_name='bench', api_key='bench', api_secret='bench')
+        try:
+            rows = [
+                (workers, [self.batch(server, size, workers, options) for size in options['batches']])
+                for workers in options['workers']
+            ]
+        finally:
+            cloudinary.config(**previous)
+            server.close()
+
+        self.stdout.write('')
+        self.stdout.write(f'{options["size"]} KB files, fake Cloudinary delay {options["delay"]}s per upload')
+        self.stdout.write('')
+        self.stdout.write(f'{"workers":<10}' + ''.join(f'{f"{size} files":>12}' for size in options['batches']))
+        for workers, results in rows:
+            self.stdout.write(f'{workers:<10}' + ''.join(f'{wall:>11.2f}s' for wall, _ in results))
+
+        failures = sum(failed for _, results in rows for _, failed in results)
+        self.stdout.write(f'Most uploads the stand-in saw at once: {server.max_in_flight}')
+        if failures:
+            self.stdout.write(self.style.WARNING(f'{failures} uploads failed.'))
+        else:
+            baseline, widest = rows[0][1][-1][0], min(wall for _, results in rows for wall, _ in results[-1:])
+            self.stdout.write(self.style.SUCCESS(
+                f'{options["batches"][-1]} files: {baseline:.2f}s at {rows[0][0]} worker(s), '
+                f'{widest:.2f}s at best ({baseline / widest:.1f}x)'
+            ))
+
+    def batch(self, server, size, workers, options):
+        """Wall time and failed uploads of one batch"""
+        files = [
+            SimpleUploadedFile(f'bench-{i}.jpg', os.urandom(options['size'] * 1024), content_type='image/jpeg')
+            for i in range(size)
+        ]
+        started = time.perf_counter()
+        results = upload_many(files, folder='bench', max_workers=workers)
+        wall = time.perf_counter() - started
+        return wall, sum(1 for result in results if isinstance(result, Exception))
@@ -0,0 +1,115 @@
+"""
+Management command to compare chat prompt sizes before and after the token budget
+Usage: python manage.py bench_prompt_budget [--conversations 200] [--turns 20] [--seed 7]
+
+Replays a synthetic conversation corpus (seeded, so runs are comparable)
+through the old prompt assembly - system prompt plus the last 10 messages,
+whatever their length - and through utils.prompt_builder, and reports the
+prompt sizes in tokens.
+"""
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from myApp.utils.prompt_builder import (
+    build_prompt, count_message_tokens, fold_session, new_session, tiktoken,
+)
+from myApp.chat import CHAT_SYSTEM_PROMPT
+from myApp.utils.telemetry import percentile
+
+WORDS = (
+    'I lead a team of people and sometimes feel the weight of every decision alone '
+    'my manager expects results while my family needs me home earlier than ever '
+    'we restructured last quarter and I am still carrying the conversations I had '
+    'how do you stay present when everyone turns to you for answers you do not have '
+    'burnout trust courage silence strength responsibility mentor coach board '
+    'honestly it feels like nobody asks how the leader is doing'
+).split()
+
+
+def sentence(rng, min_words=6, max_words=22):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return ' '.join(words).capitalize() + rng.choice(['.', '.', '?', '!'])
+
+
+def visitor_message(rng):
+    """Mostly short messages, with the occasional long story"""
+    if rng.random() < 0.15:
+        return ' '.join(sentence(rng) for _ in range(rng.randint(12, 25)))
+    return ' '.join(sentence(rng) for _ in range(rng.randint(1, 3)))
+
+
+def assistant_reply(rng):
+    return ' '.join(sentence(rng) for _ in range(rng.randint(2, 5)))
+
+
+def percentiles(values):
+    return percentile(values, 0.5), percentile(values, 0.95), max(values), statistics.mean(values)
+
+
+class Command(BaseCommand):
+    help = 'Report p50/p95 chat prompt sizes for history[-10:] versus the token-budgeted prompt builder'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--conversations',
+            type=int,
+            default=200,
+            help='Synthetic conversations to replay (default: 200)',
+        )
+        parser.add_argument(
+            '--turns',
+            type=int,
+            default=20,
+            help='Turns per conversation (default: 20)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=7,
+            help='Random seed for the corpus (default: 7)',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        old_sizes, new_sizes, build_us = [], [], []
+
+        for _ in range(options['conversations']):
+            history = []  # What the widget used to post back
+            session = new_session()
+            for _ in range(options['turns']):
+                message, reply = visitor_message(rng), assistant_reply(rng)
+
+                old_prompt = [{'role': 'system', 'content': CHAT_SYSTEM_PROMPT}]
+                old_prompt += history[-10:] + [{'role': 'user', 'content': message}]
+                old_sizes.append(count_message_tokens(old_prompt))
+
+                started = time.perf_counter()
+                new_prompt = build_prompt(CHAT_SYSTEM_PROMPT, session, message)
+                build_us.append((time.perf_counter() - started) * 1e6)
+                new_sizes.append(count_message_tokens(new_prompt))
+
+                turn = [{'role': 'user', 'content': message}, {'role': 'assistant', 'content': reply}]
+                history += turn
+                session['messages'] = session['messages'] + turn
+                fold_session(session)
+
+        counter = 'tiktoken o200k_base' if tiktoken is not None else 'local estimate'
+        self.stdout.write(
+            f'{len(old_sizes)} prompts from {options["conversations"]} conversations, '
+            f'budget {getattr(settings, "CHAT_PROMPT_TOKEN_BUDGET", 1200)} tokens ({counter})'
+        )
+        self.stdout.write('')
+        self.stdout.write(f'{"prompt tokens":<22}{"p50":>8}{"p95":>8}{"max":>8}{"mean":>8}')
+        for label, sizes in (('history[-10:]', old_sizes), ('token budget', new_sizes)):
+            p50, p95, worst, mean = percentiles(sizes)
+            self.stdout.write(f'{label:<22}{p50:>8.0f}{p95:>8.0f}{worst:>8.0f}{mean:>8.0f}')
+
+        p50, p95, _, _ = percentiles(build_us)
+        self.stdout.write('')
+        self.stdout.write(f'build_prompt: p50 {p50:.0f} us, p95 {p95:.0f} us')
+        saved = 1 - sum(new_sizes) / sum(old_sizes)
+        self.stdout.write(self.style.SUCCESS(f'Prompt tokens sent: {saved:.0%} fewer in total'))
@@ -0,0 +1,55 @@
+"""
+Management command to build, list or roll back homepage snapshots
+Usage: python manage.py homepage_snapshot [--rebuild] [--list] [--rollback VERSION]
+"""
+from django.core.management.base import BaseCommand
+
+from myApp.models import HomepageSnapshot
+from myApp.snapshots import activate_homepage_snapshot, rebuild_homepage_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Build, list or roll back materialized homepage snapshots'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Build a new snapshot from the current content',
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='List stored snapshots',
+        )
+        parser.add_argument(
+            '--rollback',
+            type=int,
+            metavar='VERSION',
+            help='Serve an existing snapshot again',
+        )
+
+    def handle(self, *args, **options):
+        if options.get('rebuild'):
+            snapshot = rebuild_homepage_snapshot(force=True)
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Built snapshot v{snapshot.version} in {snapshot.build_ms} ms'
+            ))
+
+        if options.get('rollback') is not None:
+            version = options['rollback']
+            if not HomepageSnapshot.objects.filter(version=version).exists():
+                self.stdout.write(self.style.ERROR(f'Snapshot v{version} not found'))
+                return
+            activate_homepage_snapshot(version)
+            self.stdout.write(self.style.SUCCESS(f'✓ Homepage now serves snapshot v{version}'))
+
+        if options.get('list') or not (options.get('rebuild') or options.get('rollback') is not None):
+            snapshots = HomepageSnapshot.objects.only('version', 'is_current', 'build_ms', 'created_at')
+            if not snapshots:
+                self.stdout.write(self.style.WARNING('No snapshots yet. Run with --rebuild to build one.'))
+            for snapshot in snapshots:
+                marker = '*' if snapshot.is_current else ' '
+                self.stdout.write(
+                    f'{marker} v{snapshot.version:<5} {snapshot.created_at:%Y-%m-%d %H:%M:%S}  {snapshot.build_ms} ms'
+                )
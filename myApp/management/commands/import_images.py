@@ -7,7 +7,7 @@ import os
 import glob
 
 from myApp.models import MediaAsset
-from myApp.utils.cloudinary_utils import upload_to_cloudinary
+from myApp.utils.cloudinary_utils import file_sha256, upload_to_cloudinary
 
 
 class Command(BaseCommand):
@@ -77,6 +77,7 @@ class Command(BaseCommand):
 
         # Process each image
         success_count = 0
+        skipped_count = 0
         error_count = 0
 
         for image_path in image_files:
@@ -85,18 +86,26 @@ class Command(BaseCommand):
                 filename = os.path.basename(image_path)
                 title = os.path.splitext(filename)[0].replace('_', ' ').replace('-', ' ')
                 
-                # Check if image already exists (by filename)
-                existing = MediaAsset.objects.filter(title=title).first()
-                if existing:
-                    self.stdout.write(
-                        self.style.WARNING(f'⏭  Skipping {filename} (already exists)')
-                    )
-                    continue
-
-                # Open and upload image
-                self.stdout.write(f'📤 Uploading {filename}...', ending=' ')
-                
                 with open(image_path, 'rb') as f:
+                    # Check if image already exists (same content, whatever its name)
+                    sha256 = file_sha256(f)
+                    existing = MediaAsset.objects.filter(sha256=sha256).first()
+                    if not existing:
+                        # Assets imported before hashing have no sha256: fall back to the title
+                        # check for those, and record the hash so the next run matches by content
+                        existing = MediaAsset.objects.filter(sha256__isnull=True, title=title).first()
+                        if existing:
+                            existing.sha256 = sha256
+                            existing.save(update_fields=['sha256'])
+                    if existing:
+                        self.stdout.write(
+                            self.style.WARNING(f'⏭  Skipping {filename} (already exists as "{existing.title}")')
+                        )
+                        skipped_count += 1
+                        continue
+
+                    # Upload image
+                    self.stdout.write(f'📤 Uploading {filename}...', ending=' ')
                     upload_result = upload_to_cloudinary(
                         f,
                         folder=cloudinary_folder,
@@ -115,6 +124,7 @@ class Command(BaseCommand):
                     width=upload_result['width'],
                     height=upload_result['height'],
                     file_size=upload_result['bytes'],
+                    sha256=sha256,
                 )
 
                 self.stdout.write(self.style.SUCCESS('✓ Done'))
@@ -130,6 +140,8 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS('=' * 50))
         self.stdout.write(self.style.SUCCESS(f'Import complete!'))
         self.stdout.write(f'  ✓ Successfully imported: {success_count}')
+        if skipped_count > 0:
+            self.stdout.write(f'  ⏭  Already in the library: {skipped_count}')
         if error_count > 0:
             self.stdout.write(self.style.ERROR(f'  ✗ Errors: {error_count}'))
         self.stdout.write(self.style.SUCCESS('=' * 50))
@@ -0,0 +1,225 @@
+"""
+Management command to load test the chat through the real view stack
+Usage: python manage.py loadtest_chat [--conversations 50] [--turns 5] [--think-time 1.0]
+                                      [--latency 0.8] [--tokens-per-second 40] [--error-rate 0.0]
+                                      [--timeout-rate 0.0] [--seed 7] [--stream] [--configured-backend]
+
+Drives --conversations concurrent visitors, each with its own IP and chat
+session, through myProject.asgi.application (middleware, rate limits,
+sessions, retrieval, prompt builder, retries and circuit breaker) on a
+single event loop - one ASGI worker. Each visitor sends --turns synthetic
+messages, pausing about --think-time seconds between them.
+
+Completions come from the in-process FakeBackend (utils/chat_backends.py),
+so no OpenAI call is made. --configured-backend uses CHAT_BACKEND instead.
+
+Reports throughput, p50/p99 latency (and time to first token with
+--stream) and the error rate by kind, to size workers for chat traffic.
+"""
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from myApp.utils import openai_client
+from myApp.utils.chat_backends import get_backend
+from myApp.utils.chat_sessions import get_max_message_chars
+from myApp.utils.telemetry import percentile
+
+from .bench_prompt_budget import visitor_message
+
+
+class Command(BaseCommand):
+    help = 'Drive concurrent chat conversations through the real view stack against a fake backend'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conversations', type=int, default=50, help='Concurrent visitors (default: 50)')
+        parser.add_argument('--turns', type=int, default=5, help='Messages per visitor (default: 5)')
+        parser.add_argument(
+            '--think-time', type=float, default=1.0,
+            help='Average seconds a visitor waits between messages (default: 1.0)',
+        )
+        parser.add_argument(
+            '--latency', type=float, default=0.8,
+            help='Fake backend: seconds before the first token (default: 0.8)',
+        )
+        parser.add_argument(
+            '--tokens-per-second', type=float, default=40,
+            help='Fake backend: reply pace (default: 40)',
+        )
+        parser.add_argument(
+            '--error-rate', type=float, default=0.0,
+            help='Fake backend: share of calls failing with a 500 (default: 0)',
+        )
+        parser.add_argument(
+            '--timeout-rate', type=float, default=0.0,
+            help='Fake backend: share of calls timing out (default: 0)',
+        )
+        parser.add_argument('--seed', type=int, default=7, help='Seed for messages and injected errors (default: 7)')
+        parser.add_argument('--stream', action='store_true', help='Request streamed (Server-Sent Events) replies')
+        parser.add_argument(
+            '--configured-backend', action='store_true',
+            help='Use CHAT_BACKEND as configured instead of the fake (may spend OpenAI calls)',
+        )
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run(options))
+
+    async def run(self, options):
+        overrides = {}
+        if not options['configured_backend']:
+            overrides = {
+                'CHAT_BACKEND': 'myApp.utils.chat_backends.FakeBackend',
+                'CHAT_BACKEND_OPTIONS': {
+                    'latency': options['latency'],
+                    'tokens_per_second': options['tokens_per_second'],
+                    'error_rate': options['error_rate'],
+                    'timeout_rate': options['timeout_rate'],
+                    'seed': options['seed'],
+                },
+            }
+        with override_settings(**overrides):
+            await cache.aclear()  # Full rate-limit buckets and free in-flight slots
+            from myProject.asgi import application
+
+            self.application = application
+            backend = get_backend()
+            counters_before = openai_client.get_stats()['counters']
+            started = time.perf_counter()
+            visitors = await asyncio.gather(*(
+                # Every visitor has its own IP, as far as the rate limits can tell
+                self.conversation(f'10.{i // 250}.{i % 250}.1', random.Random(f'{options["seed"]}:{i}'), options)
+                for i in range(options['conversations'])
+            ))
+            wall = time.perf_counter() - started
+            counters = openai_client.get_stats()['counters']
+
+        turns = [turn for visitor in visitors for turn in visitor]
+        self.report(turns, wall, backend, counters, counters_before, options)
+
+    async def conversation(self, client_ip, rng, options):
+        """One visitor's turns, as dicts of outcome, latency, time to first token and source"""
+        session_id, turns = None, []
+        for turn in range(options['turns']):
+            if turn:
+                await asyncio.sleep(rng.uniform(0, 2 * options['think_time']))
+            message = visitor_message(rng)[:get_max_message_chars()]
+            result = await self.send(client_ip, message, session_id, options['stream'])
+            session_id = result.pop('session_id') or session_id
+            turns.append(result)
+        return turns
+
+    async def send(self, client_ip, message, session_id, stream):
+        """
+        POST one message straight to the ASGI application - not through
+        httpx's ASGITransport, which buffers the whole body and would hide
+        the time to first token.
+        """
+        body = json.dumps({'message': message, 'session_id': session_id, 'stream': stream}).encode('utf-8')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'POST', 'scheme': 'http', 'path': '/api/chat/', 'raw_path': b'/api/chat/',
+            'query_string': b'', 'root_path': '',
+            'headers': [
+                (b'host', settings.ALLOWED_HOSTS[0].encode('ascii')),
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode('ascii')),
+            ],
+            'client': (client_ip, 40000), 'server': ('testserver', 80),
+        }
+        requested = False
+        disconnected = asyncio.Event()
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        started = time.perf_counter()
+        result = {'outcome': 'ok', 'ttft': None, 'source': None, 'session_id': None, 'status': None}
+        chunks = []
+
+        async def send(event):
+            if event['type'] == 'http.response.start':
+                result['status'] = event['status']
+                headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in event['headers']}
+                result['session_id'] = headers.get('x-chat-session-id')
+                result['source'] = headers.get('x-chat-source')
+            elif event['type'] == 'http.response.body':
+                if event.get('body'):
+                    if result['ttft'] is None and b'"delta"' in event['body']:
+                        result['ttft'] = time.perf_counter() - started
+                    chunks.append(event['body'])
+
+        try:
+            await self.application(scope, receive, send)
+        finally:
+            disconnected.set()
+        result['latency'] = time.perf_counter() - started
+
+        text = b''.join(chunks).decode('utf-8')
+        if result['status'] != 200:
+            result['outcome'] = f'HTTP {result["status"]}'
+        elif stream:
+            events = [json.loads(line[len('data: '):]) for line in text.splitlines() if line.startswith('data: ')]
+            if any('error' in event for event in events):
+                result['outcome'] = 'stream error'
+            elif not any(event.get('done') for event in events):
+                result['outcome'] = 'stream cut off'
+        return result
+
+    def report(self, turns, wall, backend, counters, counters_before, options):
+        ok = [turn for turn in turns if turn['outcome'] == 'ok']
+        outcomes = Counter(turn['outcome'] for turn in turns)
+        sources = Counter(turn['source'] for turn in ok)
+
+        self.stdout.write('')
+        if backend.name == 'fake':
+            self.stdout.write(
+                f'Fake backend: latency {options["latency"]}s, {options["tokens_per_second"]:g} tokens/s, '
+                f'{options["error_rate"]:.0%} errors, {options["timeout_rate"]:.0%} timeouts'
+            )
+        else:
+            self.stdout.write(f'Backend: {settings.CHAT_BACKEND}')
+        self.stdout.write(
+            f'{options["conversations"]} conversations x {options["turns"]} turns, '
+            f'think time ~{options["think_time"]}s, {"streamed" if options["stream"] else "JSON"} replies, one worker'
+        )
+        self.stdout.write('')
+        self.stdout.write(f'Turns: {len(turns)} in {wall:.1f}s - {len(turns) / wall:.1f} turns/s, '
+                          f'{len(ok) / wall:.1f} answered/s')
+        latencies = [turn['latency'] * 1000 for turn in ok]
+        if latencies:
+            self.stdout.write(f'Latency ms: p50 {percentile(latencies, 0.5):.0f}  '
+                              f'p99 {percentile(latencies, 0.99):.0f}')
+        ttfts = [turn['ttft'] * 1000 for turn in ok if turn['ttft'] is not None]
+        if ttfts:
+            self.stdout.write(f'Time to first token ms: p50 {percentile(ttfts, 0.5):.0f}  '
+                              f'p99 {percentile(ttfts, 0.99):.0f}')
+        self.stdout.write('Answered by: ' + ', '.join(f'{source} {count}' for source, count in sources.most_common()))
+
+        errors = len(turns) - len(ok)
+        self.stdout.write(f'Errors: {errors} ({errors / len(turns):.1%})' + (
+            ' - ' + ', '.join(f'{outcome} {count}' for outcome, count in outcomes.most_common() if outcome != 'ok')
+            if errors else ''
+        ))
+        retries = counters.get('retries', 0) - counters_before.get('retries', 0)
+        rejected = counters.get('rejected', 0) - counters_before.get('rejected', 0)
+        self.stdout.write(f'Upstream: {retries} retries, {rejected} rejected by the open circuit')
+        if hasattr(backend, 'snapshot'):
+            snapshot = backend.snapshot()
+            self.stdout.write(f'Backend calls: {snapshot["calls"]}, at most {snapshot["max_in_flight"]} at once')
+
+        if errors:
+            self.stdout.write(self.style.WARNING(f'{errors} turns failed.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Every turn was answered.'))
@@ -0,0 +1,58 @@
+"""
+Management command to see what the chat retrieval index returns for a message
+Usage: python manage.py search_site_content "how do you mentor leaders?" [--k 3]
+
+Runs the local TF-IDF index (utils/retrieval.py) offline - no OpenAI call -
+and prints the matches with their scores, the context block the prompt
+would carry, and whether the message would be answered locally instead.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from myApp.utils.retrieval import find_local_answer, get_chat_context, site_index
+
+
+class Command(BaseCommand):
+    help = 'Print the site content the chatbot would retrieve for a message'
+
+    def add_arguments(self, parser):
+        parser.add_argument('message', help='Visitor message to search for')
+        parser.add_argument(
+            '--k',
+            type=int,
+            default=getattr(settings, 'CHAT_RETRIEVAL_TOP_K', 3),
+            help='Number of matches (default: CHAT_RETRIEVAL_TOP_K)',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        refreshed = site_index.refresh()
+        refresh_ms = (time.perf_counter() - started) * 1000
+        self.stdout.write(
+            f'Index: {len(site_index.index.documents)} documents, '
+            f'{len(site_index.index.vocabulary)} terms (refreshed {len(refreshed)} models in {refresh_ms:.1f} ms)'
+        )
+
+        started = time.perf_counter()
+        results = site_index.search(options['message'], k=options['k'], min_score=0)
+        search_ms = (time.perf_counter() - started) * 1000
+        self.stdout.write('')
+        for score, document in results:
+            self.stdout.write(f'  {score:.3f}  {document["label"]}: {document["title"]}')
+        if not results:
+            self.stdout.write(self.style.WARNING('  No matching content'))
+
+        self.stdout.write('')
+        context = get_chat_context(options['message'], k=options['k'])
+        self.stdout.write(context or '(no context block - nothing above CHAT_RETRIEVAL_MIN_SCORE)')
+        self.stdout.write('')
+        local_answer = find_local_answer(options['message'])
+        if local_answer is not None:
+            self.stdout.write(f'Answered locally ({local_answer["key"]}, score {local_answer["score"]}):')
+            self.stdout.write(f'  {local_answer["answer"]}')
+        else:
+            self.stdout.write('Sent to OpenAI (not a question, or no FAQ or service above CHAT_LOCAL_ANSWER_THRESHOLD)')
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f'Search took {search_ms:.2f} ms'))
@@ -3,12 +3,15 @@ Management command to seed the database with books section content
 Run with: python manage.py seed_books
 """
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from myApp.models import BooksSection, PublishedBook
 
 
 class Command(BaseCommand):
     help = 'Seeds the database with books section content'
 
+    # One transaction: the homepage is invalidated and its snapshot rebuilt once
+    @transaction.atomic
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Starting to seed books content...'))
 
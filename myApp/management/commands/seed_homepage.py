@@ -3,6 +3,7 @@ Management command to seed the database with initial homepage content
 Run with: python manage.py seed_homepage
 """
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from myApp.models import (
     SEO, Navigation, Hero, About, Stat, Service, ServicesSection,
     Portfolio, PortfolioProject, Testimonial, FAQ, FAQSection, Contact,
@@ -13,6 +14,8 @@ from myApp.models import (
 class Command(BaseCommand):
     help = 'Seeds the database with initial homepage content'
 
+    # One transaction: the homepage is invalidated and its snapshot rebuilt once
+    @transaction.atomic
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Starting to seed homepage content...'))
         
@@ -0,0 +1,28 @@
+"""
+Middleware for the public site
+"""
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+
+from .publishing import serve_published_homepage
+
+
+class PublishedHomepageMiddleware(MiddlewareMixin):
+    """
+    Serve GET/HEAD "/" from the static export written by publish_homepage,
+    negotiating the gzip/brotli variant from Accept-Encoding. Requests fall
+    through to views.home when nothing is published or the export is stale.
+
+    Built on MiddlewareMixin so it supports both sync and async requests:
+    under ASGI a sync-only middleware would force every async view (the
+    chat endpoint) back onto a thread.
+    """
+
+    def process_request(self, request):
+        if (
+            request.path_info == '/'
+            and request.method in ('GET', 'HEAD')
+            and getattr(settings, 'HOMEPAGE_SERVE_PUBLISHED', True)
+        ):
+            return serve_published_homepage(request)
+        return None
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.2 on 2026-10-17 20:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0008_bookssection_publishedbook'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HomepageSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(unique=True)),
+                ('content', models.JSONField(blank=True, default=dict)),
+                ('content_version', models.CharField(blank=True, max_length=64)),
+                ('build_ms', models.FloatField(default=0)),
+                ('is_current', models.BooleanField(db_index=True, default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Homepage Snapshot',
+                'verbose_name_plural': 'Homepage Snapshots',
+                'ordering': ['-version'],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.2 on 2026-10-17 20:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0009_homepagesnapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contactformfield',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['sort_order', 'id'], name='contactformfield_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactinfo',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['sort_order', 'id'], name='contactinfo_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='decadestimelineitem',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['sort_order', 'id'], name='timelineitem_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='faq',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['sort_order', 'id'], name='faq_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='navigation',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['order', 'id'], name='navigation_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='portfolioproject',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['sort_order', 'id'], name='portfolioproject_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publishedbook',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['sort_order', 'id'], name='publishedbook_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['sort_order', 'id'], name='service_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sociallink',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['sort_order', 'id'], name='sociallink_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stat',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['sort_order', 'id'], name='stat_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testimonial',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['sort_order', 'id'], name='testimonial_active_idx'),
+        ),
+    ]
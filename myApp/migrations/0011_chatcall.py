@@ -0,0 +1,36 @@
+# Generated by Django 5.1.2 on 2026-10-17 21:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0010_content_active_order_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatCall',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(db_index=True)),
+                ('source', models.CharField(blank=True, max_length=20)),
+                ('model', models.CharField(blank=True, max_length=100)),
+                ('outcome', models.CharField(max_length=20)),
+                ('error', models.CharField(blank=True, max_length=100)),
+                ('streamed', models.BooleanField(default=False)),
+                ('queue_ms', models.FloatField(blank=True, null=True)),
+                ('upstream_ms', models.FloatField(blank=True, null=True)),
+                ('ttft_ms', models.FloatField(blank=True, null=True)),
+                ('total_ms', models.FloatField()),
+                ('prompt_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('completion_tokens', models.PositiveIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Chat Call',
+                'verbose_name_plural': 'Chat Calls',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
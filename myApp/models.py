@@ -19,6 +19,8 @@ class MediaAsset(models.Model):
     width = models.IntegerField(null=True, blank=True)
     height = models.IntegerField(null=True, blank=True)
     file_size = models.IntegerField(null=True, blank=True)  # in bytes
+    # SHA-256 of the file as uploaded (before any compression); null for assets added before hashing
+    sha256 = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -60,6 +62,10 @@ class Navigation(models.Model):
 
     class Meta:
         ordering = ['order', 'id']
+        indexes = [
+            # Homepage query: filter(is_active=True).order_by('order', 'id')
+            models.Index(fields=['order', 'id'], condition=models.Q(is_active=True), name='navigation_active_idx'),
+        ]
         verbose_name_plural = "Navigation Items"
 
     def __str__(self):
@@ -115,6 +121,10 @@ class Stat(models.Model):
 
     class Meta:
         ordering = ['sort_order', 'id']
+        indexes = [
+            # Homepage query: filter(is_active=True).order_by('sort_order', 'id')
+            models.Index(fields=['sort_order', 'id'], condition=models.Q(is_active=True), name='stat_active_idx'),
+        ]
         verbose_name = "Statistic"
         verbose_name_plural = "Statistics"
 
@@ -136,6 +146,10 @@ class Service(models.Model):
 
     class Meta:
         ordering = ['sort_order', 'id']
+        indexes = [
+            # Homepage query: filter(is_active=True).order_by('sort_order', 'id')
+            models.Index(fields=['sort_order', 'id'], condition=models.Q(is_active=True), name='service_active_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -189,6 +203,10 @@ class PortfolioProject(models.Model):
 
     class Meta:
         ordering = ['sort_order', 'id']
+        indexes = [
+            # Homepage query: filter(is_active=True).order_by('sort_order', 'id')
+            models.Index(fields=['sort_order', 'id'], condition=models.Q(is_active=True), name='portfolioproject_active_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -208,6 +226,10 @@ class Testimonial(models.Model):
 
     class Meta:
         ordering = ['sort_order', 'id']
+        indexes = [
+            # Homepage query: filter(is_active=True).order_by('sort_order', 'id')
+            models.Index(fields=['sort_order', 'id'], condition=models.Q(is_active=True), name='testimonial_active_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.company}"
@@ -224,6 +246,10 @@ class FAQ(models.Model):
 
     class Meta:
         ordering = ['sort_order', 'id']
+        indexes = [
+            # Homepage query: filter(is_active=True).order_by('sort_order', 'id')
+            models.Index(fields=['sort_order', 'id'], condition=models.Q(is_active=True), name='faq_active_idx'),
+        ]
         verbose_name = "FAQ"
         verbose_name_plural = "FAQs"
 
@@ -296,6 +322,10 @@ class ContactInfo(models.Model):
 
     class Meta:
         ordering = ['sort_order', 'id']
+        indexes = [
+            # Homepage query: filter(is_active=True).order_by('sort_order', 'id')
+            models.Index(fields=['sort_order', 'id'], condition=models.Q(is_active=True), name='contactinfo_active_idx'),
+        ]
         verbose_name = "Contact Info"
         verbose_name_plural = "Contact Info"
 
@@ -323,6 +353,10 @@ class ContactFormField(models.Model):
 
     class Meta:
         ordering = ['sort_order', 'id']
+        indexes = [
+            # Homepage query: filter(is_active=True).order_by('sort_order', 'id')
+            models.Index(fields=['sort_order', 'id'], condition=models.Q(is_active=True), name='contactformfield_active_idx'),
+        ]
         verbose_name = "Contact Form Field"
         verbose_name_plural = "Contact Form Fields"
 
@@ -351,6 +385,10 @@ class SocialLink(models.Model):
 
     class Meta:
         ordering = ['sort_order', 'id']
+        indexes = [
+            # Homepage query: filter(is_active=True).order_by('sort_order', 'id')
+            models.Index(fields=['sort_order', 'id'], condition=models.Q(is_active=True), name='sociallink_active_idx'),
+        ]
         verbose_name = "Social Link"
         verbose_name_plural = "Social Links"
 
@@ -407,6 +445,10 @@ class DecadesTimelineItem(models.Model):
 
     class Meta:
         ordering = ['sort_order', 'id']
+        indexes = [
+            # Homepage query: filter(is_active=True).order_by('sort_order', 'id')
+            models.Index(fields=['sort_order', 'id'], condition=models.Q(is_active=True), name='timelineitem_active_idx'),
+        ]
         verbose_name = "Decades Timeline Item"
         verbose_name_plural = "Decades Timeline Items"
 
@@ -477,8 +519,54 @@ class PublishedBook(models.Model):
 
     class Meta:
         ordering = ['sort_order', 'id']
+        indexes = [
+            # Homepage query: filter(is_active=True).order_by('sort_order', 'id')
+            models.Index(fields=['sort_order', 'id'], condition=models.Q(is_active=True), name='publishedbook_active_idx'),
+        ]
         verbose_name = "Published Book"
         verbose_name_plural = "Published Books"
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+
+class HomepageSnapshot(models.Model):
+    """Fully assembled homepage content, rebuilt whenever content is saved"""
+    version = models.PositiveIntegerField(unique=True)
+    content = JSONField(default=dict, blank=True)  # Output of get_homepage_content_from_db
+    content_version = models.CharField(max_length=64, blank=True)  # Content cache version it is served for
+    build_ms = models.FloatField(default=0)  # Time taken to assemble the content
+    is_current = models.BooleanField(default=False, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-version']
+        verbose_name = "Homepage Snapshot"
+        verbose_name_plural = "Homepage Snapshots"
+
+    def __str__(self):
+        return f"Homepage Snapshot v{self.version}"
+
+
+class ChatCall(models.Model):
+    """Timings, token counts and outcome of one chat turn (see utils/telemetry.py)"""
+    created_at = models.DateTimeField(db_index=True)  # When the turn started, not when it was flushed
+    source = models.CharField(max_length=20, blank=True)  # local, cache, coalesced, openai, fake...
+    model = models.CharField(max_length=100, blank=True)
+    outcome = models.CharField(max_length=20)  # ok, error, busy, circuit_open, not_configured, cancelled
+    error = models.CharField(max_length=100, blank=True)  # Exception class for outcome "error"
+    streamed = models.BooleanField(default=False)
+    queue_ms = models.FloatField(null=True, blank=True)  # Before the upstream call: coalescing, retrieval, slot
+    upstream_ms = models.FloatField(null=True, blank=True)  # Upstream call, retries included, to the last token
+    ttft_ms = models.FloatField(null=True, blank=True)  # Streamed: until the first token
+    total_ms = models.FloatField()
+    prompt_tokens = models.PositiveIntegerField(null=True, blank=True)
+    completion_tokens = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Chat Call"
+        verbose_name_plural = "Chat Calls"
+
+    def __str__(self):
+        return f"{self.created_at:%Y-%m-%d %H:%M:%S} {self.source or '-'} {self.outcome} {self.total_ms:.0f} ms"
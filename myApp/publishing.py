@@ -0,0 +1,195 @@
+"""
+Publishing - Static export of the rendered homepage
+
+publish_homepage() renders myApp/home.html once with the current content and
+writes it to HOMEPAGE_EXPORT_ROOT together with gzip and brotli variants.
+PublishedHomepageMiddleware (see middleware.py) then serves "/" straight
+from those files for as long as the export matches the current content:
+its ETag carries the content version, read from the cache every process
+shares, so any worker can tell whether the export is current.
+"""
+import gzip
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .content_cache import get_homepage_content, homepage_etag, homepage_last_modified, store_homepage_content
+
+try:
+    import brotli
+except ImportError:  # Optional - only the .br variant is skipped
+    brotli = None
+
+INDEX_FILE = 'index.html'
+MANIFEST_FILE = 'manifest.json'
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = (
+    ('br', '.br'),
+    ('gzip', '.gz'),
+)
+
+# Process-local copy of the manifest: (mtime, manifest)
+_manifest_cache = None
+
+
+def get_export_root():
+    return Path(getattr(settings, 'HOMEPAGE_EXPORT_ROOT', settings.BASE_DIR / 'published'))
+
+
+def _write_atomic(path, data):
+    """Write bytes to path via a temporary file so readers never see a partial file"""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def publish_homepage():
+    """
+    Render the homepage and write it to the export root.
+    Returns the manifest describing the written files.
+    """
+    # The export is served while its ETag matches the content version the
+    # web workers read; a cache private to this process never will
+    if isinstance(caches['default'], (LocMemCache, DummyCache)):
+        raise ImproperlyConfigured(
+            'Publishing the homepage needs a cache shared with the web workers (Redis or a '
+            'database cache, see CACHES); with a per-process cache the export is never served.'
+        )
+
+    started = time.perf_counter()
+    root = get_export_root()
+    root.mkdir(parents=True, exist_ok=True)
+
+    # Validators are read before rendering: if content changes meanwhile the
+    # export is already stale and will not be served
+    etag = homepage_etag(None)
+    last_modified = homepage_last_modified(None)
+
+    content = get_homepage_content()
+    html = render_to_string('myApp/home.html', {'content': content}).encode('utf-8')
+    store_homepage_content(content)
+
+    index_path = root / INDEX_FILE
+    files = {'identity': len(html)}
+    variants = {'gzip': gzip.compress(html, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(html, mode=brotli.MODE_TEXT)
+
+    # Compressed variants first, so the manifest never points at missing files
+    for encoding, suffix in ENCODINGS:
+        variant_path = root / f'{INDEX_FILE}{suffix}'
+        if encoding in variants:
+            _write_atomic(variant_path, variants[encoding])
+            files[encoding] = len(variants[encoding])
+        elif variant_path.exists():
+            variant_path.unlink()
+    _write_atomic(index_path, html)
+
+    manifest = {
+        'etag': etag,
+        'last_modified': last_modified.timestamp() if last_modified else None,
+        'published_at': time.time(),
+        'render_ms': round((time.perf_counter() - started) * 1000, 1),
+        'files': files,
+    }
+    _write_atomic(root / MANIFEST_FILE, json.dumps(manifest, indent=2).encode('utf-8'))
+    return manifest
+
+
+def get_published_manifest():
+    """Return the manifest of the current export, or None if nothing is published"""
+    global _manifest_cache
+    path = get_export_root() / MANIFEST_FILE
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return None
+
+    cached = _manifest_cache
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    try:
+        manifest = json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    _manifest_cache = (mtime, manifest)
+    return manifest
+
+
+def _accepted_encodings(request):
+    """Encodings the client accepts (q > 0) from its Accept-Encoding header"""
+    accepted = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding)
+    return accepted
+
+
+def serve_published_homepage(request):
+    """
+    Serve the exported homepage if it matches the current content.
+    Returns None when there is no usable export, so the caller can fall
+    back to rendering the page.
+    """
+    manifest = get_published_manifest()
+    if manifest is None:
+        return None
+
+    etag = homepage_etag(request)
+    if etag is None or manifest.get('etag') != etag:
+        return None
+
+    quoted_etag = f'"{etag}"'
+    last_modified = manifest.get('last_modified')
+    last_modified = int(last_modified) if last_modified else None
+    response = get_conditional_response(request, etag=quoted_etag, last_modified=last_modified)
+    if response is None:
+        root = get_export_root()
+        accepted = _accepted_encodings(request)
+        path, encoding = root / INDEX_FILE, None
+        for candidate, suffix in ENCODINGS:
+            if candidate in manifest['files'] and (candidate in accepted or '*' in accepted):
+                path, encoding = root / f'{INDEX_FILE}{suffix}', candidate
+                break
+        try:
+            response = FileResponse(open(path, 'rb'), content_type='text/html; charset=utf-8')
+        except OSError:
+            return None
+        if encoding:
+            response['Content-Encoding'] = encoding
+
+    response['ETag'] = quoted_etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    patch_cache_control(response, no_cache=True)
+    return response
@@ -0,0 +1,50 @@
+"""
+Signal handlers - keep cached homepage content in sync with the database
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from .content_cache import invalidate_homepage_content
+from .content_helpers import HOMEPAGE_CONTENT_MODELS
+from .snapshots import rebuild_homepage_snapshot
+
+
+class ContentChanges:
+    """The content models changed in one transaction, published once it commits"""
+
+    def __init__(self, models):
+        self.models = set(models)
+
+    def __call__(self):
+        invalidate_homepage_content(*self.models)
+        rebuild_homepage_snapshot()
+
+
+def homepage_content_changed(sender, using, **kwargs):
+    """
+    Invalidate the homepage snapshot when any content model changes, and
+    rebuild the materialized HomepageSnapshot, once the transaction has
+    committed - one bump and one rebuild per transaction, however many rows
+    it saved. Bumping the version earlier would let a request that still
+    reads the old rows cache them under the new version until the next edit.
+    """
+    connection = transaction.get_connection(using)
+    changes = getattr(connection, 'homepage_content_changes', None)
+    # Dropped from run_on_commit when its transaction rolled back
+    if changes is not None and any(entry[1] is changes for entry in connection.run_on_commit):
+        changes.models.add(sender)
+        return
+    # Outside a transaction on_commit runs it right away: the model goes in first
+    changes = connection.homepage_content_changes = ContentChanges([sender])
+    transaction.on_commit(changes, using=using, robust=True)
+
+
+for model in HOMEPAGE_CONTENT_MODELS:
+    post_save.connect(
+        homepage_content_changed, sender=model,
+        dispatch_uid=f'homepage_content_save_{model.__name__}',
+    )
+    post_delete.connect(
+        homepage_content_changed, sender=model,
+        dispatch_uid=f'homepage_content_delete_{model.__name__}',
+    )
@@ -0,0 +1,51 @@
+"""
+Singletons - The one-row section models (SEO, Hero, About, ...)
+
+Each of these models holds a single row with pk=SINGLETON_PK, edited from
+the dashboard and read by the homepage (see load_section in
+content_helpers.py, which reads the same row).
+
+get_singleton() keeps the row in a process-local cache keyed by the model's
+version (see content_cache.py). Saving or deleting the row bumps that
+version (see signals.py), so every process reloads it on its next use. The
+row is created at most once, on the first use that asks for it.
+"""
+import copy
+import threading
+
+from .content_cache import get_model_versions
+from .content_helpers import SECTION_SPECS, SINGLETON_PK
+
+# Models whose section is a single row
+SINGLETON_MODELS = tuple(spec.model for spec in SECTION_SPECS if not spec.many)
+
+# Process-local cache: model label -> (model version, instance or None)
+_singletons = {}
+_singletons_lock = threading.Lock()
+
+
+def get_singleton(model, create=True):
+    """
+    Return the singleton row of a section model.
+
+    The row is created if it does not exist yet, unless create is False, in
+    which case None is returned. Every call returns a fresh copy, so callers
+    can modify and save it without touching the cached instance.
+    """
+    label = model._meta.label
+    version = get_model_versions([model])[label]
+
+    cached = _singletons.get(label)
+    if cached is not None and cached[0] == version and (cached[1] is not None or not create):
+        instance = cached[1]
+    else:
+        instance = model.objects.filter(pk=SINGLETON_PK).first()
+        if instance is None and create:
+            instance, _ = model.objects.get_or_create(pk=SINGLETON_PK)
+            # Creating the row bumped the model version
+            version = get_model_versions([model])[label]
+        with _singletons_lock:
+            _singletons[label] = (version, instance)
+
+    return copy.copy(instance) if instance is not None else None
+
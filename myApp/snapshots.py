@@ -0,0 +1,82 @@
+"""
+Homepage snapshots - Materialized copy of the assembled homepage content
+
+Every transaction that saves content rebuilds a HomepageSnapshot row (once
+it commits) holding the full output of get_homepage_content_from_db, so the
+public page reads a single row instead of one query per section. Old snapshots are kept for instant rollback.
+"""
+import logging
+import time
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+
+from .content_cache import get_content_version, invalidate_homepage_content
+from .content_helpers import get_homepage_content_from_db
+from .models import HomepageSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+def rebuild_homepage_snapshot(force=False):
+    """
+    Assemble the homepage content and store it as the current snapshot.
+    Skipped when the current snapshot was already built for the current
+    content version. Saves schedule one rebuild per transaction (see
+    signals.py), so wrap bulk edits in one transaction to keep the
+    rollback history from filling up with intermediate snapshots.
+    """
+    content_version = get_content_version()
+    current = HomepageSnapshot.objects.filter(is_current=True).only('content_version').first()
+    if not force and current is not None and current.content_version == content_version:
+        return current
+
+    started = time.perf_counter()
+    with transaction.atomic():
+        content = get_homepage_content_from_db()
+        build_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        latest = HomepageSnapshot.objects.select_for_update().order_by('-version').first()
+        HomepageSnapshot.objects.filter(is_current=True).update(is_current=False)
+        snapshot = HomepageSnapshot.objects.create(
+            version=latest.version + 1 if latest else 1,
+            content=content,
+            content_version=content_version,
+            build_ms=build_ms,
+            is_current=True,
+        )
+
+    logger.info('Built homepage snapshot v%s in %.1f ms', snapshot.version, build_ms)
+    prune_homepage_snapshots()
+    return snapshot
+
+
+def activate_homepage_snapshot(version):
+    """
+    Roll the public homepage back (or forward) to an existing snapshot.
+    The page keeps serving it until the next content save.
+    """
+    # The snapshot is marked as current for a fresh content version, which
+    # is only published once the rollback has committed
+    content_version = uuid.uuid4().hex
+    with transaction.atomic():
+        snapshot = HomepageSnapshot.objects.select_for_update().get(version=version)
+        HomepageSnapshot.objects.filter(is_current=True).update(is_current=False)
+        snapshot.content_version = content_version
+        snapshot.is_current = True
+        snapshot.save(update_fields=['content_version', 'is_current'])
+        transaction.on_commit(lambda: invalidate_homepage_content(version=content_version))
+    return snapshot
+
+
+def prune_homepage_snapshots():
+    """Delete all but the newest HOMEPAGE_SNAPSHOT_KEEP snapshots (the current one is always kept)"""
+    keep = getattr(settings, 'HOMEPAGE_SNAPSHOT_KEEP', 50)
+    stale_ids = list(
+        HomepageSnapshot.objects.filter(is_current=False)
+        .order_by('-version')
+        .values_list('id', flat=True)[keep:]
+    )
+    if stale_ids:
+        HomepageSnapshot.objects.filter(id__in=stale_ids).delete()
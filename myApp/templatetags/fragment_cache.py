@@ -0,0 +1,50 @@
+"""
+Fragment cache for the homepage partials
+
+Usage: {% cached_include 'myApp/partials/_hero.html' 'hero' %}
+
+Renders the partial like {% include %}, but caches the HTML under a key made
+of the template digest and the versions of the models behind the listed
+content sections. Editing one model only re-renders the partials that list
+a section read from it; every other partial is served from the cache without
+touching content (so no queries run for it).
+"""
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+from myApp.content_cache import get_homepage_templates_state, get_model_versions
+from myApp.content_helpers import SECTION_MODELS
+
+register = template.Library()
+
+FRAGMENT_KEY = 'homepage:fragment:{}:{}'
+
+
+def _get_model_versions(context):
+    """Versions of every content model, fetched once per page render"""
+    versions = context.render_context.get('homepage_model_versions')
+    if versions is None:
+        versions = get_model_versions(set(SECTION_MODELS.values()))
+        context.render_context['homepage_model_versions'] = versions
+    return versions
+
+
+@register.simple_tag(takes_context=True)
+def cached_include(context, template_name, *sections):
+    versions = _get_model_versions(context)
+    digest = hashlib.sha256(get_homepage_templates_state()[0].encode())
+    for section in sections:
+        digest.update(f'|{section}:{versions[SECTION_MODELS[section]._meta.label]}'.encode())
+    key = FRAGMENT_KEY.format(template_name, digest.hexdigest()[:32])
+
+    html = cache.get(key)
+    if html is None:
+        partial = context.template.engine.get_template(template_name)
+        with context.push():
+            html = partial.render(context)
+        cache.set(key, html, timeout=getattr(settings, 'HOMEPAGE_CACHE_TIMEOUT', 60 * 60 * 24))
+    return mark_safe(html)
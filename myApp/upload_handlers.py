@@ -0,0 +1,40 @@
+"""
+Upload handlers that hash files as they are received
+
+Django's default handlers, with the SHA-256 of each file computed chunk by
+chunk while the request body is parsed and set as `file.sha256`, so the
+dashboard can spot an image it already has (MediaAsset.sha256) without
+reading the upload again. Installed through FILE_UPLOAD_HANDLERS.
+"""
+import hashlib
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+
+class Sha256Mixin:
+
+    def new_file(self, *args, **kwargs):
+        # Before super(): the memory handler ends new_file with StopFutureHandlers
+        self.sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        data = super().receive_data_chunk(raw_data, start)
+        if data is None:
+            # This handler kept the chunk; otherwise the next handler hashes it
+            self.sha256.update(raw_data)
+        return data
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.sha256 = self.sha256.hexdigest()
+        return file
+
+
+class Sha256MemoryFileUploadHandler(Sha256Mixin, MemoryFileUploadHandler):
+    """Small uploads, kept in memory"""
+
+
+class Sha256TemporaryFileUploadHandler(Sha256Mixin, TemporaryFileUploadHandler):
+    """Large uploads, streamed to a temporary file"""
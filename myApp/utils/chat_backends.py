@@ -0,0 +1,215 @@
+"""
+Chat backends - Where chat completions come from
+
+The chat view asks get_backend() for the backend named by CHAT_BACKEND (a
+dotted path, built with CHAT_BACKEND_OPTIONS as keyword arguments) and
+hands it to utils.openai_client.create_chat_completion, which adds the
+retries and the circuit breaker.
+
+A backend's create(**kwargs) has the contract of the OpenAI SDK's
+client.chat.completions.create: it returns a ChatCompletion, or with
+stream=True an async iterator of ChatCompletionChunk with an async close(),
+and raises openai.APIError subclasses.
+
+- OpenAIBackend: the OpenAI API, through the pooled, per-process client
+- FakeBackend: an in-process, deterministic stand-in with configurable
+  latency, token rate and injected errors, for load testing without
+  spending OpenAI calls (see the loadtest_chat command). For a fake that
+  sits behind a real socket, see utils/fake_openai.py.
+
+    CHAT_BACKEND = 'myApp.utils.chat_backends.FakeBackend'
+    CHAT_BACKEND_OPTIONS = {'latency': 0.8, 'tokens_per_second': 40, 'error_rate': 0.02}
+"""
+import asyncio
+import hashlib
+import os
+import random
+import threading
+import time
+import uuid
+
+import httpx
+import openai
+from django.conf import settings
+from django.utils.module_loading import import_string
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from .openai_client import create_completion
+
+FAKE_REPLIES = (
+    "I hear how much you are carrying right now. What would it look like to "
+    "set some of that weight down, even for a moment?",
+    "That sounds like a lot to hold on your own. Who in your life gets to see "
+    "the version of you that isn't leading?",
+    "There is real strength in naming that. What do you need most right now - "
+    "clarity, rest, or someone in your corner?",
+    "Leaders rarely get asked how they are doing. So let me ask: how are you, "
+    "really, underneath all of it?",
+)
+
+FAKE_URL = 'http://fake-backend.local/v1/chat/completions'
+
+
+class ChatBackend:
+    """Base class; subclasses implement create()"""
+
+    name = None
+
+    def is_configured(self):
+        return True
+
+    async def create(self, **kwargs):
+        raise NotImplementedError
+
+
+class OpenAIBackend(ChatBackend):
+    name = 'openai'
+
+    def is_configured(self):
+        return bool(getattr(settings, 'OPENAI_API_KEY', None) or os.getenv('OPENAI_API_KEY', ''))
+
+    async def create(self, **kwargs):
+        return await create_completion(**kwargs)
+
+
+class FakeStream:
+    """Streamed fake completion: chunks paced at the backend's token rate"""
+
+    def __init__(self, backend, completion_id, model, tokens):
+        self.backend = backend
+        self.completion_id = completion_id
+        self.model = model
+        self.tokens = tokens
+        self.closed = False
+        self._ended = False
+
+    def _end(self):
+        if not self._ended:
+            self._ended = True
+            self.backend._finished()
+
+    def _chunk(self, delta, finish_reason=None):
+        return ChatCompletionChunk(
+            id=self.completion_id,
+            object='chat.completion.chunk',
+            created=int(time.time()),
+            model=self.model,
+            choices=[{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+        )
+
+    async def __aiter__(self):
+        try:
+            for token in self.tokens:
+                if self.closed:
+                    return
+                yield self._chunk({'content': token})
+                await asyncio.sleep(self.backend.token_delay)
+            yield self._chunk({}, finish_reason='stop')
+        finally:
+            self._end()
+
+    async def close(self):
+        self.closed = True
+        self._end()
+
+
+class FakeBackend(ChatBackend):
+    """
+    Deterministic local stand-in for the OpenAI API.
+
+    latency: seconds before the first token
+    tokens_per_second: pace of the reply (streamed, or added to the latency)
+    error_rate: share of calls failing with a 500 after the latency
+    timeout_rate: share of calls failing with a timeout after the latency
+    seed: the reply to a message and which calls fail depend only on the
+    seed, the message and the call's number
+    """
+
+    name = 'fake'
+
+    def __init__(self, latency=0.5, tokens_per_second=50, error_rate=0.0, timeout_rate=0.0, seed=0, replies=FAKE_REPLIES):
+        self.latency = latency
+        self.token_delay = 1 / tokens_per_second if tokens_per_second else 0
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.seed = seed
+        self.replies = replies
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _started(self):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            return self.calls
+
+    def _finished(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def reply_for(self, messages):
+        """The same last user message always gets the same reply"""
+        last = next((m['content'] for m in reversed(messages) if m['role'] == 'user'), '')
+        digest = hashlib.sha256(f'{self.seed}:{last}'.encode('utf-8')).digest()
+        return self.replies[digest[0] % len(self.replies)]
+
+    async def create(self, messages, model='gpt-4o-mini', stream=False, **kwargs):
+        call = self._started()
+        streaming = False
+        try:
+            await asyncio.sleep(self.latency)
+            roll = random.Random(f'{self.seed}:{call}').random()
+            request = httpx.Request('POST', FAKE_URL)
+            if roll < self.error_rate:
+                raise openai.InternalServerError(
+                    'Fake backend failure', response=httpx.Response(500, request=request), body=None,
+                )
+            if roll < self.error_rate + self.timeout_rate:
+                raise openai.APITimeoutError(request=request)
+
+            reply = self.reply_for(messages)
+            tokens = [word + ' ' for word in reply.split(' ')]
+            completion_id = f'chatcmpl-fake-{uuid.uuid4().hex}'
+            if stream:
+                # The stream ends the call once consumed or closed
+                streaming = True
+                return FakeStream(self, completion_id, model, tokens)
+
+            await asyncio.sleep(self.token_delay * len(tokens))
+            return ChatCompletion(
+                id=completion_id,
+                object='chat.completion',
+                created=int(time.time()),
+                model=model,
+                choices=[{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': reply},
+                    'finish_reason': 'stop',
+                }],
+            )
+        finally:
+            if not streaming:
+                self._finished()
+
+    def snapshot(self):
+        with self._lock:
+            return {'calls': self.calls, 'in_flight': self.in_flight, 'max_in_flight': self.max_in_flight}
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The CHAT_BACKEND instance, rebuilt when the setting or its options change"""
+    global _backend
+    path = getattr(settings, 'CHAT_BACKEND', 'myApp.utils.chat_backends.OpenAIBackend')
+    options = getattr(settings, 'CHAT_BACKEND_OPTIONS', {})
+    config = (path, repr(sorted(options.items())))
+    with _backend_lock:
+        if _backend is None or _backend[0] != config:
+            _backend = (config, import_string(path)(**options))
+        return _backend[1]
@@ -0,0 +1,72 @@
+"""
+Chat sessions - Server-side conversation history for the chatbot
+
+The widget sends only the new message and an opaque session id; the
+conversation itself lives in the 'chat_sessions' cache under that id, so the
+browser never resends (and can no longer forge or inflate) the history. That
+cache is shared by all workers - Redis, or a database table without
+REDIS_URL (see CACHES in settings) - so any worker can answer the next turn.
+
+A session expires CHAT_SESSION_TTL seconds after its last turn. It holds the
+recent messages (at most CHAT_MESSAGE_MAX_CHARS characters each) and a
+rolling summary of older turns, which are folded into it as the
+conversation grows (see utils/prompt_builder.py).
+
+The functions are coroutines (they use the cache's async API) for the async
+chat view.
+"""
+import re
+import secrets
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .prompt_builder import fold_session, new_session
+
+SESSION_KEY = 'chat:session:{}'
+SESSION_CACHE = 'chat_sessions'
+
+# secrets.token_urlsafe(24) produces 32 URL-safe characters
+SESSION_ID_RE = re.compile(r'^[A-Za-z0-9_-]{32}$')
+
+
+def new_session_id():
+    return secrets.token_urlsafe(24)
+
+
+def is_session_id(value):
+    return isinstance(value, str) and SESSION_ID_RE.match(value) is not None
+
+
+def get_max_message_chars():
+    return getattr(settings, 'CHAT_MESSAGE_MAX_CHARS', 2000)
+
+
+async def load_session(session_id):
+    """
+    Return (session_id, session) for the id the client sent, where session
+    is a dict as built by prompt_builder.new_session. Unknown, expired or
+    malformed ids start a new, empty session.
+    """
+    if is_session_id(session_id):
+        session = await caches[SESSION_CACHE].aget(SESSION_KEY.format(session_id))
+        if isinstance(session, list):
+            # Stored before summaries existed: a bare list of messages
+            session = dict(new_session(), messages=session)
+        if session is not None:
+            return session_id, session
+    return new_session_id(), new_session()
+
+
+async def save_turn(session_id, session, user_message, reply):
+    """Append one exchange to the session and refresh its expiry"""
+    max_chars = get_max_message_chars()
+    session = dict(session, messages=session['messages'] + [
+        {'role': 'user', 'content': user_message[:max_chars]},
+        {'role': 'assistant', 'content': reply[:max_chars]},
+    ])
+    await caches[SESSION_CACHE].aset(
+        SESSION_KEY.format(session_id),
+        fold_session(session),
+        timeout=getattr(settings, 'CHAT_SESSION_TTL', 60 * 30),
+    )
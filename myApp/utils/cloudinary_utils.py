@@ -1,10 +1,14 @@
 """
 Cloudinary utility functions for image upload and optimization
 """
+import hashlib
 import io
+import math
+from concurrent.futures import ThreadPoolExecutor, wait
 from PIL import Image
 import cloudinary
 import cloudinary.uploader
+from django.conf import settings
 from django.core.files.uploadedfile import InMemoryUploadedFile
 import sys
 
@@ -90,7 +94,30 @@ def smart_compress_to_bytes(image_file, target_bytes=TARGET_BYTES, max_quality=8
     return output
 
 
-def upload_to_cloudinary(image_file, folder='uploads', public_id=None, overwrite=False):
+def file_sha256(image_file):
+    """
+    SHA-256 of a file, as a hex string.
+    
+    Uploads received through myApp.upload_handlers already carry it
+    (computed while the request was read); other files are read in chunks
+    and rewound.
+    """
+    sha256 = getattr(image_file, 'sha256', None)
+    if sha256:
+        return sha256
+    digest = hashlib.sha256()
+    if hasattr(image_file, 'chunks'):
+        for chunk in image_file.chunks():
+            digest.update(chunk)
+    else:
+        image_file.seek(0)
+        for chunk in iter(lambda: image_file.read(64 * 1024), b''):
+            digest.update(chunk)
+        image_file.seek(0)
+    return digest.hexdigest()
+
+
+def upload_to_cloudinary(image_file, folder='uploads', public_id=None, overwrite=False, timeout=None):
     """
     Upload an image to Cloudinary with smart compression.
     
@@ -99,6 +126,7 @@ def upload_to_cloudinary(image_file, folder='uploads', public_id=None, overwrite
         folder: Cloudinary folder path
         public_id: Custom public ID (optional)
         overwrite: Whether to overwrite existing image
+        timeout: Seconds before the upload request is abandoned (optional)
     
     Returns:
         dict with upload result containing:
@@ -135,6 +163,7 @@ def upload_to_cloudinary(image_file, folder='uploads', public_id=None, overwrite
             public_id=public_id,
             overwrite=overwrite,
             resource_type='image',
+            timeout=timeout,
         )
         
         # Get image dimensions
@@ -171,6 +200,51 @@ def upload_to_cloudinary(image_file, folder='uploads', public_id=None, overwrite
         raise Exception(f"Error uploading to Cloudinary: {str(e)}")
 
 
+def upload_many(image_files, folder='uploads', max_workers=None, timeout=None):
+    """
+    Upload several images at once, at most max_workers at a time.
+    
+    Args:
+        image_files: File-like objects or InMemoryUploadedFiles
+        folder: Cloudinary folder path
+        max_workers: Uploads in parallel (default: IMAGE_UPLOAD_MAX_WORKERS)
+        timeout: Seconds allowed per file (default: IMAGE_UPLOAD_TIMEOUT)
+    
+    Returns:
+        One entry per file, in the same order: the upload_to_cloudinary
+        result dict, or the exception the upload failed with
+    """
+    if not image_files:
+        return []
+    max_workers = max_workers or getattr(settings, 'IMAGE_UPLOAD_MAX_WORKERS', 4)
+    timeout = timeout or getattr(settings, 'IMAGE_UPLOAD_TIMEOUT', 60)
+    max_workers = max(1, min(max_workers, len(image_files)))
+    
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='cloudinary-upload')
+    futures = [
+        executor.submit(upload_to_cloudinary, image_file, folder=folder, timeout=timeout)
+        for image_file in image_files
+    ]
+    # The request timeout ends each upload; this only guards against one that hangs anyway
+    rounds = math.ceil(len(image_files) / max_workers)
+    wait(futures, timeout=timeout * (rounds + 1))
+    # Don't wait for stragglers, and don't start uploads still queued
+    executor.shutdown(wait=False, cancel_futures=True)
+    
+    results = []
+    for future in futures:
+        if not future.done():
+            future.cancel()
+            results.append(TimeoutError(f"Upload did not finish within {timeout} seconds"))
+        elif future.cancelled():
+            results.append(TimeoutError("Upload was cancelled: the batch ran out of time"))
+        elif future.exception() is not None:
+            results.append(future.exception())
+        else:
+            results.append(future.result())
+    return results
+
+
 def get_cloudinary_url(public_id, transformation=None):
     """
     Generate a Cloudinary URL with optional transformations.
@@ -0,0 +1,135 @@
+"""
+Fake Cloudinary upload API for local benchmarking
+
+A small threaded HTTP server that answers POST /v1_1/<cloud>/image/upload
+like Cloudinary does, after a configurable delay. It reads the whole
+upload and sends back the fields upload_to_cloudinary uses. Point the
+Cloudinary SDK at it with
+cloudinary.config(upload_prefix=server.upload_prefix, cloud_name=...,
+api_key=..., api_secret=...); any credentials work.
+
+Run standalone:
+    python -m myApp.utils.fake_cloudinary [--port 8766] [--delay 0.5] [--fail-rate 0.0]
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeCloudinaryServer:
+    """
+    Fake image upload endpoint.
+
+    delay: seconds each upload takes once received
+    fail_rate: share of uploads answered with a 500 error after the delay
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, delay=0.5, fail_rate=0.0):
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.requests = 0
+        self.bytes_received = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def upload_prefix(self):
+        return f'http://{self.host}:{self.port}'
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-cloudinary', daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _started(self, size):
+        with self._lock:
+            self.requests += 1
+            self.bytes_received += size
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _finished(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                size = int(self.headers.get('Content-Length') or 0)
+                self.rfile.read(size)
+                server._started(size)
+                try:
+                    time.sleep(server.delay)
+                    if not self.path.endswith('/image/upload'):
+                        self._respond(404, {'error': {'message': 'Not found'}})
+                    elif random.random() < server.fail_rate:
+                        self._respond(500, {'error': {'message': 'Fake upload failure'}})
+                    else:
+                        cloud_name = self.path.split('/')[2]
+                        public_id = f'bench/{uuid.uuid4().hex}'
+                        self._respond(200, {
+                            'public_id': public_id,
+                            'secure_url': f'https://res.cloudinary.com/{cloud_name}/image/upload/{public_id}.jpg',
+                            'width': 1600,
+                            'height': 1200,
+                            'format': 'jpg',
+                            'bytes': size,
+                        })
+                finally:
+                    server._finished()
+
+            def _respond(self, status, data):
+                body = json.dumps(data).encode('utf-8')
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client gave up (its timeout) during the delay
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake Cloudinary upload server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--delay', type=float, default=0.5, help='Seconds each upload takes')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Share of uploads answered with a 500')
+    args = parser.parse_args()
+    server = FakeCloudinaryServer(args.host, args.port, args.delay, args.fail_rate).start()
+    print(f'Fake Cloudinary upload API on {server.upload_prefix} (delay {args.delay}s)')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
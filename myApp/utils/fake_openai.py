@@ -0,0 +1,184 @@
+"""
+Fake OpenAI upstream for local load testing
+
+A tiny asyncio HTTP server answering POST /v1/chat/completions like the
+OpenAI API does, after a configurable delay, for both plain and streamed
+(stream: true) requests. Point the app at it with
+OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 (any OPENAI_API_KEY works).
+
+Run standalone:
+    python -m myApp.utils.fake_openai [--port 8765] [--delay 2.0] [--fail-rate 0.0]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+DEFAULT_REPLY = (
+    "I hear how much you are carrying right now. What would it look like to "
+    "set some of that weight down, even for a moment?"
+)
+
+
+class FakeOpenAIServer:
+    """
+    Fake chat completions endpoint.
+
+    delay: seconds before the first token (the whole reply when not streaming)
+    token_delay: seconds between streamed chunks
+    fail_rate: share of requests answered with a 500 error after the delay
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, delay=2.0, token_delay=0.02, reply=DEFAULT_REPLY,
+                 fail_rate=0.0):
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.token_delay = token_delay
+        self.reply = reply
+        self.fail_rate = fail_rate
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._server = None
+        self._connections = set()
+
+    @property
+    def base_url(self):
+        return f'http://{self.host}:{self.port}/v1'
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            # Kept-alive client connections would otherwise outlive the server
+            connections = list(self._connections)
+            for task in connections:
+                task.cancel()
+            await asyncio.gather(*connections, return_exceptions=True)
+            await self._server.wait_closed()
+
+    async def _handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            # Keep-alive: serve requests until the client closes the connection
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                if method == 'POST' and path.rstrip('/').endswith('/chat/completions'):
+                    await self._chat_completion(json.loads(body or b'{}'), writer)
+                else:
+                    self._write_response(writer, 404, {'error': {'message': f'Unknown endpoint {path}'}})
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _chat_completion(self, payload, writer):
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if random.random() < self.fail_rate:
+                self._write_response(writer, 500, {'error': {'message': 'Fake upstream failure', 'type': 'server_error'}})
+                return
+            completion_id = f'chatcmpl-{uuid.uuid4().hex}'
+            model = payload.get('model', 'gpt-4o-mini')
+            if not payload.get('stream'):
+                self._write_response(writer, 200, {
+                    'id': completion_id,
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': model,
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': self.reply},
+                        'finish_reason': 'stop',
+                    }],
+                    'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+                })
+                return
+
+            writer.write(
+                b'HTTP/1.1 200 OK\r\n'
+                b'Content-Type: text/event-stream\r\n'
+                b'Transfer-Encoding: chunked\r\n\r\n'
+            )
+            for token in self.reply.split(' '):
+                self._write_chunk(writer, completion_id, model, {'content': token + ' '})
+                await writer.drain()
+                await asyncio.sleep(self.token_delay)
+            self._write_chunk(writer, completion_id, model, {}, finish_reason='stop')
+            self._write_event(writer, '[DONE]')
+            writer.write(b'0\r\n\r\n')
+        finally:
+            self.in_flight -= 1
+
+    def _write_chunk(self, writer, completion_id, model, delta, finish_reason=None):
+        self._write_event(writer, json.dumps({
+            'id': completion_id,
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+        }))
+
+    @staticmethod
+    def _write_event(writer, data):
+        event = f'data: {data}\n\n'.encode('utf-8')
+        writer.write(f'{len(event):x}\r\n'.encode('ascii') + event + b'\r\n')
+
+    @staticmethod
+    def _write_response(writer, status, data):
+        body = json.dumps(data).encode('utf-8')
+        reason = {200: 'OK', 404: 'Not Found', 500: 'Internal Server Error'}.get(status, 'Error')
+        writer.write(
+            f'HTTP/1.1 {status} {reason}\r\n'
+            f'Content-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n\r\n'.encode('latin-1') + body
+        )
+
+
+async def serve(host, port, delay, token_delay, fail_rate):
+    server = await FakeOpenAIServer(host, port, delay, token_delay, fail_rate=fail_rate).start()
+    print(f'Fake OpenAI upstream on {server.base_url} (delay {delay}s)')
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake OpenAI chat completions server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=2.0, help='Seconds before the reply starts')
+    parser.add_argument('--token-delay', type=float, default=0.02, help='Seconds between streamed chunks')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Share of requests answered with a 500')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.delay, args.token_delay, args.fail_rate))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,361 @@
+"""
+OpenAI client - Pooled async client with timeouts, retries and a circuit breaker
+
+get_client() returns one AsyncOpenAI per process, built lazily with bounded
+timeouts and a pooled HTTP client, so connections and TLS sessions are
+reused across chats. A client's connections belong to the event loop they
+were opened on, and under WSGI every request runs on a fresh loop (see
+async_to_sync), so the client lives on a long-lived loop of its own, in a
+daemon thread, and create_completion() runs each call there whatever loop
+the caller is on.
+
+create_chat_completion() wraps a chat backend's create() - the OpenAI API
+through that client, or a local fake (see utils/chat_backends.py):
+- retryable failures (timeouts, connection errors, 429, 5xx) are retried up
+  to OPENAI_MAX_RETRIES times with full-jitter exponential backoff
+- every call goes through a circuit breaker: once the upstream error rate
+  over the last OPENAI_BREAKER_WINDOW calls reaches
+  OPENAI_BREAKER_THRESHOLD, calls fail fast with CircuitOpenError for
+  OPENAI_BREAKER_RESET_TIMEOUT seconds, after which one trial call decides
+  whether to close the circuit again
+
+Counters are kept per process and exposed by get_stats() (see the
+dashboard's chat-status endpoint).
+"""
+import asyncio
+import atexit
+import random
+import threading
+import time
+from collections import Counter, deque
+
+import httpx
+import openai
+from django.conf import settings
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Status codes worth retrying: the request may succeed on another attempt
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+CIRCUIT_OPEN_MESSAGE = (
+    "I'm taking a short pause right now and can't respond. "
+    "Please try again in a minute."
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling OpenAI while the circuit is open"""
+
+    def __init__(self, retry_after):
+        super().__init__(CIRCUIT_OPEN_MESSAGE)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker.
+
+    closed: calls go through; the outcome of the last `window` calls is kept
+    open: calls are rejected until `reset_timeout` seconds have passed
+    half_open: one trial call goes through; success closes the circuit,
+    failure opens it again
+    """
+
+    def __init__(self, threshold=0.5, window=20, min_calls=5, reset_timeout=30):
+        self.threshold = threshold
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.opened_at = None
+        self.transitions = Counter()
+        self._outcomes = deque(maxlen=window)
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def _transition(self, state):
+        self.transitions[f'{self.state}->{state}'] += 1
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        elif state == CLOSED:
+            self._outcomes.clear()
+
+    def retry_after(self):
+        """Seconds until an open circuit lets a trial call through"""
+        if self.state != OPEN:
+            return 0
+        return max(0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def allow(self):
+        """Whether a call may go through now"""
+        with self._lock:
+            if self.state == OPEN:
+                if self.retry_after() > 0:
+                    return False
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._trial_in_flight = False
+                self._transition(CLOSED)
+            else:
+                self._outcomes.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._trial_in_flight = False
+                self._transition(OPEN)
+                return
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if (
+                self.state == CLOSED
+                and len(self._outcomes) >= self.min_calls
+                and failures / len(self._outcomes) >= self.threshold
+            ):
+                self._transition(OPEN)
+
+    def release(self):
+        """Give up a half-open trial call without a verdict"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def snapshot(self):
+        with self._lock:
+            calls = len(self._outcomes)
+            return {
+                'state': self.state,
+                'error_rate': round(self._outcomes.count(False) / calls, 3) if calls else 0.0,
+                'window_calls': calls,
+                'retry_after': round(self.retry_after(), 1),
+                'transitions': dict(self.transitions),
+            }
+
+
+breaker = CircuitBreaker(
+    threshold=getattr(settings, 'OPENAI_BREAKER_THRESHOLD', 0.5),
+    window=getattr(settings, 'OPENAI_BREAKER_WINDOW', 20),
+    min_calls=getattr(settings, 'OPENAI_BREAKER_MIN_CALLS', 5),
+    reset_timeout=getattr(settings, 'OPENAI_BREAKER_RESET_TIMEOUT', 30),
+)
+
+# requests, successes, failures, retries, rejected (by the open circuit)
+stats = Counter()
+_stats_lock = threading.Lock()
+
+# (api key, base url) -> AsyncOpenAI, only touched on the client loop
+_clients = {}
+_client_loop = None
+_client_loop_lock = threading.Lock()
+
+
+def _count(name):
+    with _stats_lock:
+        stats[name] += 1
+
+
+def get_client_loop():
+    """The long-lived event loop the shared client runs on, started on first use"""
+    global _client_loop
+    with _client_loop_lock:
+        if _client_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='openai-client', daemon=True).start()
+            atexit.register(_close_clients)
+            _client_loop = loop
+    return _client_loop
+
+
+async def run_on_client_loop(coro):
+    """Await a coroutine on the client loop, from any loop; cancelling the caller cancels it"""
+    loop = get_client_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+def get_client():
+    """The shared AsyncOpenAI client; only use it on the client loop"""
+    api_key = getattr(settings, 'OPENAI_API_KEY', '')
+    base_url = getattr(settings, 'OPENAI_BASE_URL', None) or None
+    client = _clients.get((api_key, base_url))
+    if client is None:
+        timeout = getattr(settings, 'OPENAI_TIMEOUT', 20)
+        client = _clients[(api_key, base_url)] = openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=httpx.Timeout(timeout, connect=getattr(settings, 'OPENAI_CONNECT_TIMEOUT', 5)),
+            max_retries=0,  # Retried here, with jitter and the circuit breaker
+            http_client=openai.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=getattr(settings, 'OPENAI_MAX_CONNECTIONS', 100),
+                    max_keepalive_connections=getattr(settings, 'OPENAI_MAX_KEEPALIVE_CONNECTIONS', 20),
+                ),
+            ),
+        )
+    return client
+
+
+def _close_clients():
+    async def close():
+        for client in list(_clients.values()):
+            await client.close()
+        _clients.clear()
+
+    try:
+        asyncio.run_coroutine_threadsafe(close(), _client_loop).result(timeout=5)
+    except Exception:
+        pass  # Exiting anyway
+
+
+class ClientLoopStream:
+    """A streamed completion that lives on the client loop, iterated from another loop"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await run_on_client_loop(self._stream.__anext__())
+
+    async def close(self):
+        await run_on_client_loop(self._stream.close())
+
+
+async def create_completion(**kwargs):
+    """client.chat.completions.create on the client loop, with the shared client"""
+    async def create():
+        return await get_client().chat.completions.create(**kwargs)
+
+    response = await run_on_client_loop(create())
+    return ClientLoopStream(response) if kwargs.get('stream') else response
+
+
+def is_retryable(error):
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code in RETRYABLE_STATUS_CODES
+
+
+def backoff_delay(attempt, error=None):
+    """Full-jitter exponential backoff, honouring a Retry-After header up to the cap"""
+    cap = getattr(settings, 'OPENAI_RETRY_MAX_DELAY', 8)
+    if isinstance(error, openai.APIStatusError):
+        retry_after = error.response.headers.get('retry-after')
+        try:
+            return min(cap, float(retry_after))
+        except (TypeError, ValueError):
+            pass
+    base = getattr(settings, 'OPENAI_RETRY_BASE_DELAY', 0.5)
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class GuardedStream:
+    """
+    A streamed completion that reports its outcome to the breaker.
+
+    Reading it to the end records a success, an error while reading it a
+    failure. close() must be called however the stream ends (chat_turn does,
+    in a finally): it closes the upstream stream, and a stream given up
+    before its end - cancelled, or the visitor gone - frees the half-open
+    trial call without a verdict on the upstream.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._chunks = aiter(stream)
+        self._settled = False
+        self._closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._settled:
+            raise StopAsyncIteration
+        try:
+            return await anext(self._chunks)
+        except StopAsyncIteration:
+            self._settle(failed=False)
+            raise
+        except Exception:
+            self._settle(failed=True)
+            raise
+
+    def _settle(self, failed):
+        self._settled = True
+        if failed:
+            _count('failures')
+            breaker.record_failure()
+        else:
+            _count('successes')
+            breaker.record_success()
+
+    async def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if not self._settled:
+            self._settled = True
+            breaker.release()
+        await self._stream.close()
+
+
+async def create_chat_completion(backend, **kwargs):
+    """
+    backend.create (see utils.chat_backends) with retries and the circuit breaker.
+    With stream=True it returns a GuardedStream, which the caller must close().
+    Raises CircuitOpenError while the circuit is open.
+    """
+    if not breaker.allow():
+        _count('rejected')
+        raise CircuitOpenError(breaker.retry_after())
+    _count('requests')
+
+    max_retries = getattr(settings, 'OPENAI_MAX_RETRIES', 2)
+    attempt = 0
+    while True:
+        try:
+            response = await backend.create(**kwargs)
+        except openai.APIError as e:
+            if is_retryable(e) and attempt < max_retries:
+                _count('retries')
+                await asyncio.sleep(backoff_delay(attempt, e))
+                attempt += 1
+                continue
+            if is_retryable(e):
+                _count('failures')
+                breaker.record_failure()
+            else:
+                # The upstream answered (bad request, auth...): not an outage
+                breaker.record_success()
+            raise
+        except BaseException:
+            # Cancelled or unexpected: no verdict on the upstream
+            breaker.release()
+            raise
+
+        if kwargs.get('stream'):
+            return GuardedStream(response)
+        _count('successes')
+        breaker.record_success()
+        return response
+
+
+def get_stats():
+    """Counters and circuit state for this process"""
+    with _stats_lock:
+        counters = dict(stats)
+    return {'counters': counters, 'circuit': breaker.snapshot()}
@@ -0,0 +1,164 @@
+"""
+Rate limit - Per-client token buckets and a global in-flight cap for the chat
+
+Both are kept in Django's cache, which every worker shares (Redis, or a
+database table without REDIS_URL - see CACHES in settings), so they all
+enforce the same limits.
+
+Token buckets: each client IP, and each chat session, may send
+CHAT_RATE_LIMIT_BURST messages at once and then one every
+1 / CHAT_RATE_LIMIT_RATE seconds. A bucket is stored as a single timestamp -
+when it will be full again (the "generic cell rate algorithm" form of a
+token bucket) - so taking a token is one read and one write.
+
+In-flight cap: at most CHAT_MAX_IN_FLIGHT chats may wait on OpenAI at once,
+across all workers. Each holds one of that many slot keys, added with
+cache.add (atomic on every backend) and deleted when the reply is done. A
+slot also expires after CHAT_IN_FLIGHT_LEASE seconds, so a worker that dies
+mid-chat cannot leak it.
+
+Taking a token is atomic within a process (a lock around the read and the
+write) but not across workers: two workers taking a client's last token at
+the same moment may both get it. That lets a client go slightly over its
+rate, which is fine for shedding load; the in-flight cap is exact.
+"""
+import math
+import random
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+BUCKET_KEY = 'chat:ratelimit:{}:{}'
+SLOT_KEY = 'chat:inflight:{}'
+
+RATE_LIMITED_MESSAGE = (
+    "You're sending messages faster than I can take them in. "
+    "Let's slow down a little - please try again in a moment."
+)
+BUSY_MESSAGE = (
+    "I'm with a lot of people right now and can't respond. "
+    "Please try again in a moment."
+)
+
+# Makes taking a token atomic within a process
+_bucket_lock = threading.Lock()
+
+
+class RateLimited(Exception):
+    """Raised when a client is over its rate or every in-flight slot is taken"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def client_ip(remote_addr, forwarded_for=None):
+    """
+    The visitor's IP. Behind CHAT_TRUSTED_PROXY_COUNT proxies (Railway's edge:
+    1) the peer is the last proxy, so it is the entry that many hops from the
+    right of X-Forwarded-For - entries further left are whatever the client
+    sent and can't be trusted. Without trusted proxies, the peer address.
+    """
+    proxies = getattr(settings, 'CHAT_TRUSTED_PROXY_COUNT', 0)
+    if proxies and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(',') if hop.strip()]
+        if hops:
+            return hops[-min(proxies, len(hops))]
+    return remote_addr or 'unknown'
+
+
+def get_client_ip(request):
+    """client_ip of an HTTP request"""
+    return client_ip(request.META.get('REMOTE_ADDR'), request.META.get('HTTP_X_FORWARDED_FOR'))
+
+
+def get_scope_client_ip(scope):
+    """client_ip of an ASGI connection scope (the chat WebSocket)"""
+    forwarded_for = b','.join(value for name, value in scope.get('headers', []) if name == b'x-forwarded-for')
+    return client_ip((scope.get('client') or [None])[0], forwarded_for.decode('latin-1'))
+
+
+def take_token(scope, identity, rate=None, burst=None):
+    """
+    Take one token from the bucket of `identity` (an IP, a session id...).
+    Returns 0 when allowed, otherwise the seconds until a token is available.
+    """
+    rate = rate or getattr(settings, 'CHAT_RATE_LIMIT_RATE', 0.2)
+    burst = burst or getattr(settings, 'CHAT_RATE_LIMIT_BURST', 5)
+    interval = 1 / rate
+    key = BUCKET_KEY.format(scope, identity)
+
+    with _bucket_lock:
+        now = time.time()
+        full_at = max(cache.get(key) or now, now)
+        new_full_at = full_at + interval
+        allowed_at = new_full_at - burst * interval
+        if allowed_at > now:
+            return allowed_at - now
+        cache.set(key, new_full_at, timeout=math.ceil(new_full_at - now) + 1)
+        return 0
+
+
+def _check_rate_limit(client_ip, session_id):
+    retry_after = take_token('ip', client_ip)
+    if not retry_after and session_id:
+        retry_after = take_token('session', session_id)
+    if retry_after:
+        raise RateLimited(RATE_LIMITED_MESSAGE, retry_after)
+
+
+async def check_client_rate_limit(client_ip, session_id=None):
+    """Raise RateLimited when the client IP or the chat session is over its rate"""
+    await sync_to_async(_check_rate_limit)(client_ip, session_id)
+
+
+async def check_rate_limit(request, session_id=None):
+    """check_client_rate_limit for the IP of an HTTP request"""
+    await check_client_rate_limit(get_client_ip(request), session_id)
+
+
+class InFlightSlot:
+    """
+    One of the CHAT_MAX_IN_FLIGHT slots, held while a chat waits on OpenAI.
+
+        slot = await InFlightSlot.acquire()  # raises RateLimited when all are taken
+        try:
+            ...
+        finally:
+            await slot.release()
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.released = False
+
+    @classmethod
+    async def acquire(cls):
+        capacity = getattr(settings, 'CHAT_MAX_IN_FLIGHT', 50)
+        lease = getattr(settings, 'CHAT_IN_FLIGHT_LEASE', 120)
+        keys = [SLOT_KEY.format(i) for i in range(capacity)]
+        taken = await cache.aget_many(keys)
+        free = [key for key in keys if key not in taken]
+        # Start anywhere, so concurrent requests rarely race for the same slot
+        random.shuffle(free)
+        for key in free:
+            if await cache.aadd(key, 1, timeout=lease):
+                return cls(key)
+        raise RateLimited(BUSY_MESSAGE, getattr(settings, 'CHAT_BUSY_RETRY_AFTER', 5))
+
+    async def release(self):
+        if not self.released:
+            self.released = True
+            await cache.adelete(self.key)
+
+
+def get_stats():
+    """In-flight slots taken right now, across all workers"""
+    capacity = getattr(settings, 'CHAT_MAX_IN_FLIGHT', 50)
+    return {
+        'in_flight': len(cache.get_many([SLOT_KEY.format(i) for i in range(capacity)])),
+        'max_in_flight': capacity,
+    }
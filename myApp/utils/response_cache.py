@@ -0,0 +1,168 @@
+"""
+Response cache - Reuse chat replies to repeated opening lines
+
+Opening lines ("hi", "who are you?", "tell me about your book") repeat
+constantly. With CHAT_RESPONSE_CACHE_ENABLED, the reply to such a message
+is kept in a process-local LRU (CHAT_RESPONSE_CACHE_SIZE entries, each
+expiring after CHAT_RESPONSE_CACHE_TTL seconds) and served again instead of
+a new completion.
+
+The key is the normalized message plus a hash of the last
+CHAT_RESPONSE_CACHE_HISTORY messages of the session, so the same words in
+a different conversation are a different entry. The whole cache is flushed
+when the persona (system prompt and completion options) or the site content
+version changes.
+
+Turns that may carry personal details are never cached: messages longer
+than CHAT_RESPONSE_CACHE_MAX_WORDS words, conversations that already have a
+summary, and any message in the key with an email, URL, handle, number or
+a first-person statement ("my ...", "I'm ...").
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+
+from ..content_cache import get_content_version
+
+NORMALIZE_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+PERSONAL_DETAILS_RE = re.compile(
+    r"""
+    [\w.+-]+@[\w-]+\.[\w.]+             # email
+    | @\w+                              # handle
+    | https?://|www\.                   # URL
+    | \d{3,}                            # phone, date, amount, address...
+    | \b(?:my|mine|myself|our|ours|i'm|im|i\s+am|i've|i\s+was|i\s+feel|call\s+me|we're|we\s+are)\b
+    """,
+    re.I | re.X,
+)
+
+
+def normalize_message(text):
+    """Lowercase words only: "Hi!!", "hi" and " HI." are the same message"""
+    return ' '.join(NORMALIZE_RE.findall(text.lower()))
+
+
+def has_personal_details(text):
+    return PERSONAL_DETAILS_RE.search(text) is not None
+
+
+class ResponseCache:
+    """
+    Bounded LRU with a TTL per entry. Entries belong to a generation; a
+    lookup or store under another generation empties the cache first.
+    """
+
+    def __init__(self, max_size=256, ttl=3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = Counter()
+        self._entries = OrderedDict()
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def _check_generation(self, generation):
+        if generation != self._generation:
+            if self._entries:
+                self.stats['flushes'] += 1
+            self._entries.clear()
+            self._generation = generation
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def get(self, key, generation):
+        with self._lock:
+            self._check_generation(generation)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                self.stats['expired'] += 1
+                entry = None
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[1]
+
+    def set(self, key, generation, value):
+        with self._lock:
+            self._check_generation(generation)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            self.stats['stores'] += 1
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else 0.0,
+                'counters': dict(self.stats),
+            }
+
+
+response_cache = ResponseCache(
+    max_size=getattr(settings, 'CHAT_RESPONSE_CACHE_SIZE', 256),
+    ttl=getattr(settings, 'CHAT_RESPONSE_CACHE_TTL', 60 * 60),
+)
+
+
+def is_enabled():
+    return getattr(settings, 'CHAT_RESPONSE_CACHE_ENABLED', False)
+
+
+def _cache_key(session, user_message):
+    """The key for this turn, or None when it must not be cached"""
+    if session['summary']:
+        return None
+    if len(user_message.split()) > getattr(settings, 'CHAT_RESPONSE_CACHE_MAX_WORDS', 12):
+        return None
+    recent = session['messages'][-getattr(settings, 'CHAT_RESPONSE_CACHE_HISTORY', 2):]
+    if any(has_personal_details(text) for text in [user_message] + [m['content'] for m in recent]):
+        return None
+    history = hashlib.sha256(
+        '\n'.join(f'{m["role"]}:{normalize_message(m["content"])}' for m in recent).encode('utf-8')
+    ).hexdigest()[:16]
+    return f'{history}:{normalize_message(user_message)}'
+
+
+def _generation(persona):
+    """Changes with the persona (system prompt and completion options) or the site content"""
+    persona_hash = hashlib.sha256(json.dumps(persona, sort_keys=True).encode('utf-8')).hexdigest()
+    return persona_hash, get_content_version()
+
+
+def get_cached_reply(session, user_message, persona):
+    """The cached reply for this turn, or None"""
+    if not is_enabled():
+        return None
+    key = _cache_key(session, user_message)
+    if key is None:
+        response_cache.count('skipped')
+        return None
+    return response_cache.get(key, _generation(persona))
+
+
+def cache_reply(session, user_message, persona, reply):
+    """Keep the reply to this turn, when caching is enabled and the turn may be cached"""
+    if not is_enabled() or not reply:
+        return
+    key = _cache_key(session, user_message)
+    if key is not None:
+        response_cache.set(key, _generation(persona), reply)
+
+
+def get_stats():
+    return dict(response_cache.snapshot(), enabled=is_enabled())
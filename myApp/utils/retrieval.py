@@ -0,0 +1,286 @@
+"""
+Retrieval - Local TF-IDF index over the site content, to ground chat answers
+
+Services, published books, FAQs, the decades timeline and the Lion section
+are indexed with a NumPy TF-IDF matrix (CPU only, no network). At chat time
+get_chat_context() returns the top-k rows matching the visitor's message,
+trimmed to CHAT_RETRIEVAL_TOKEN_BUDGET tokens, for the prompt builder to
+add under the system prompt.
+
+The index is kept per process and refreshed incrementally: every source
+model has a version in the cache (bumped on save/delete, see signals.py),
+and only the models whose version changed are re-read and re-tokenized
+before the matrix is rebuilt from the stored term counts.
+
+find_local_answer() looks the message up in a second index over FAQs and
+services only: a close enough match (CHAT_LOCAL_ANSWER_THRESHOLD) is
+answered from that row directly, without calling OpenAI. Only questions are
+looked up - "I need some emotional and spiritual grounding" shares the
+words of a service but wants Maria, not its description - and chat.py only
+asks on the opening turn of a conversation.
+"""
+import math
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+
+from ..content_cache import get_model_versions
+from ..models import DecadesTimelineItem, FAQ, LionSection, PublishedBook, Service
+from .prompt_builder import count_tokens
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+STOPWORDS = frozenset("""
+a about after again all also am an and any are as at be because been before being between both but by
+can could did do does doing don't down during each few for from further had has have having he her here
+hers him his how i i'm if in into is it it's its just me more most my no nor not now of off on once only
+or other our ours out over own same she should so some such than that that's the their theirs them then
+there these they this those through to too under until up very was we were what when where which while
+who whom why will with would you you're your yours
+hi hello hey thanks thank please yes like tell know want get really much many maria
+""".split())
+
+# First words of a message that asks something
+QUESTION_WORDS = frozenset("""
+what how who where when why which is are am do does did can could will would should may
+""".split())
+
+CONTEXT_INTRO = "Relevant information from Maria's website (use it if it helps, never invent beyond it):"
+
+
+# Stripped from the end of a word when at least 4 letters remain, so that
+# "mentoring", "mentorship" and "mentors" all match "mentor"
+SUFFIXES = ('ship', 'ing', 'ed', 'es', 's')
+
+
+def stem(word):
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4 and not word.endswith('ss'):
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    """Lowercased, lightly stemmed words without stopwords"""
+    return [
+        stem(word) for word in TOKEN_RE.findall(text.lower())
+        if word not in STOPWORDS and len(word) > 1
+    ]
+
+
+class RetrievalSource:
+    """
+    A model whose active rows are indexed.
+
+    label: kind of content, shown before each snippet ("Service", "FAQ"...)
+    title_field: field naming the row; its terms count twice
+    fields: fields whose text is indexed and quoted in the snippet
+    """
+
+    def __init__(self, model, label, title_field, fields):
+        self.model = model
+        self.label = label
+        self.title_field = title_field
+        self.fields = tuple(fields)
+
+    def documents(self):
+        rows = (
+            self.model.objects.filter(is_active=True)
+            .order_by('pk')
+            .values('pk', self.title_field, *self.fields)
+        )
+        documents = []
+        for row in rows:
+            title = (row[self.title_field] or '').strip()
+            text = ' '.join(str(row[field]).strip() for field in self.fields if row[field])
+            terms = Counter(tokenize(text))
+            for term in tokenize(title):
+                terms[term] += 2
+            if terms:
+                documents.append({
+                    'key': f'{self.model._meta.label}:{row["pk"]}',
+                    'label': self.label,
+                    'title': title,
+                    'text': text,
+                    'terms': terms,
+                })
+        return documents
+
+
+RETRIEVAL_SOURCES = (
+    RetrievalSource(Service, 'Service', 'title', ['description']),
+    RetrievalSource(PublishedBook, 'Book', 'title', ['subtitle', 'description', 'publisher', 'publication_year']),
+    RetrievalSource(FAQ, 'FAQ', 'question', ['answer']),
+    RetrievalSource(DecadesTimelineItem, 'Experience', 'title', ['period', 'organization', 'description', 'reflection']),
+    RetrievalSource(LionSection, "The Lion You Don't See", 'title', [
+        'intro_text', 'paragraph_1', 'paragraph_2', 'reflection_question', 'closing_quote',
+    ]),
+)
+
+
+class TfidfIndex:
+    """Cosine-similarity search over L2-normalized TF-IDF vectors (sublinear tf, smoothed idf)"""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.vocabulary = {}
+        for document in documents:
+            for term in document['terms']:
+                self.vocabulary.setdefault(term, len(self.vocabulary))
+
+        counts = np.zeros((len(documents), len(self.vocabulary)), dtype=np.float32)
+        for row, document in enumerate(documents):
+            for term, count in document['terms'].items():
+                counts[row, self.vocabulary[term]] = count
+
+        document_frequency = np.count_nonzero(counts, axis=0)
+        self.idf = np.log((1 + len(documents)) / (1 + document_frequency)).astype(np.float32) + 1
+        self.matrix = self._normalize(self._weigh(counts))
+
+    def _weigh(self, counts):
+        weights = np.zeros_like(counts)
+        nonzero = counts > 0
+        weights[nonzero] = 1 + np.log(counts[nonzero])
+        return weights * self.idf
+
+    @staticmethod
+    def _normalize(vectors):
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    def search(self, query, k=3, min_score=0.15, strict=False):
+        """
+        The k best (score, document) pairs scoring at least min_score.
+        strict: query terms missing from every document still count towards
+        the query's length (with the highest idf), so a message that only
+        partly overlaps the index scores lower.
+        """
+        if not self.documents:
+            return []
+        query_counts = np.zeros(len(self.vocabulary), dtype=np.float32)
+        unknown = Counter()
+        for term in tokenize(query):
+            column = self.vocabulary.get(term)
+            if column is not None:
+                query_counts[column] += 1
+            else:
+                unknown[term] += 1
+        if not query_counts.any():
+            return []
+
+        weights = self._weigh(query_counts)
+        norm = np.linalg.norm(weights)
+        if strict and unknown:
+            unknown_idf = math.log(1 + len(self.documents)) + 1
+            norm = math.sqrt(norm ** 2 + sum(((1 + math.log(count)) * unknown_idf) ** 2 for count in unknown.values()))
+        scores = self.matrix @ (weights / norm)
+        best = np.argsort(-scores)[:k]
+        return [(float(scores[i]), self.documents[i]) for i in best if scores[i] >= min_score]
+
+
+class SiteIndex:
+    """Process-local TF-IDF index over RETRIEVAL_SOURCES, refreshed per model version"""
+
+    def __init__(self, sources):
+        self.sources = sources
+        self.index = TfidfIndex([])
+        self._versions = {}
+        self._documents = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Re-read the sources whose model version changed; returns their labels"""
+        versions = get_model_versions([source.model for source in self.sources])
+        with self._lock:
+            changed = [
+                source for source in self.sources
+                if self._versions.get(source.model._meta.label) != versions[source.model._meta.label]
+            ]
+            if changed:
+                for source in changed:
+                    self._documents[source.model._meta.label] = source.documents()
+                    self._versions[source.model._meta.label] = versions[source.model._meta.label]
+                self.index = TfidfIndex([
+                    document for source in self.sources
+                    for document in self._documents.get(source.model._meta.label, [])
+                ])
+        return [source.model._meta.label for source in changed]
+
+    def search(self, query, k=3, min_score=0.15, strict=False):
+        self.refresh()
+        return self.index.search(query, k=k, min_score=min_score, strict=strict)
+
+
+site_index = SiteIndex(RETRIEVAL_SOURCES)
+
+# Rows that answer a question on their own, for find_local_answer
+ANSWER_SOURCES = tuple(source for source in RETRIEVAL_SOURCES if source.model in (FAQ, Service))
+answer_index = SiteIndex(ANSWER_SOURCES)
+
+
+def format_snippet(document, max_tokens):
+    """'- Label: Title - text', cut at a word boundary to max_tokens"""
+    snippet = f'- {document["label"]}: {document["title"]}'
+    if document['text']:
+        snippet += f' - {document["text"]}'
+    if count_tokens(snippet) <= max_tokens:
+        return snippet
+    words = snippet.split()
+    # Shrink proportionally, then word by word
+    words = words[:max(1, math.floor(len(words) * max_tokens / count_tokens(snippet)))]
+    while len(words) > 1 and count_tokens(' '.join(words) + '...') > max_tokens:
+        words.pop()
+    return ' '.join(words) + '...'
+
+
+def get_chat_context(query, k=None, budget=None, min_score=None):
+    """
+    Snippets of the site content most relevant to the query, as one text
+    block within `budget` tokens, or '' when nothing relevant is found.
+    """
+    k = k or getattr(settings, 'CHAT_RETRIEVAL_TOP_K', 3)
+    budget = budget or getattr(settings, 'CHAT_RETRIEVAL_TOKEN_BUDGET', 300)
+    if min_score is None:
+        min_score = getattr(settings, 'CHAT_RETRIEVAL_MIN_SCORE', 0.15)
+
+    results = site_index.search(query, k=k, min_score=min_score)
+    if not results:
+        return ''
+
+    lines = [CONTEXT_INTRO]
+    remaining = budget - count_tokens(CONTEXT_INTRO)
+    # Split what is left evenly, so a long first match cannot crowd out the rest
+    per_snippet = remaining // len(results)
+    for _, document in results:
+        lines.append(format_snippet(document, per_snippet))
+    return '\n'.join(lines)
+
+
+def is_question(text):
+    """Whether the message asks something, rather than shares something"""
+    words = TOKEN_RE.findall(text.lower())
+    return text.rstrip().endswith('?') or (bool(words) and words[0] in QUESTION_WORDS)
+
+
+def find_local_answer(query, threshold=None):
+    """
+    The FAQ answer or service description matching the query closely
+    enough to be the reply on its own, as {'answer', 'score', 'key'}, or
+    None. Only questions are answered. Set CHAT_LOCAL_ANSWER_THRESHOLD
+    above 1 to always ask OpenAI.
+    """
+    if not is_question(query):
+        return None
+    if threshold is None:
+        threshold = getattr(settings, 'CHAT_LOCAL_ANSWER_THRESHOLD', 0.45)
+    results = answer_index.search(query, k=1, min_score=threshold, strict=True)
+    if not results:
+        return None
+    score, document = results[0]
+    answer = document['text']
+    if document['label'] != 'FAQ':
+        answer = f'{document["title"]}: {answer}'
+    return {'answer': answer, 'score': round(score, 3), 'key': document['key']}
@@ -0,0 +1,158 @@
+"""
+Single flight - Share one upstream completion between identical opening messages
+
+When a link to the site is shared, many visitors send the same suggested
+opener within seconds. Concurrent chats with the same normalized message
+and no history yet are coalesced: the first one (the leader) calls OpenAI,
+the others wait for its reply and share it.
+
+Within a process the waiters hold a concurrent.futures.Future, which works
+across threads and event loops (WSGI runs each async view on its own loop).
+Across workers the leader holds a cache lock (cache.add) and publishes its
+reply under a result key for CHAT_SINGLE_FLIGHT_RESULT_TTL seconds; a
+request finding the lock taken polls for that result. Only the first
+request of each process polls - the others in that process wait on it.
+
+If the leader fails, the waiters get None and call OpenAI themselves. A
+lock left by a dead worker expires after CHAT_SINGLE_FLIGHT_WAIT seconds.
+"""
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .response_cache import normalize_message
+
+LOCK_KEY = 'chat:single-flight:lock:{}'
+RESULT_KEY = 'chat:single-flight:result:{}'
+
+POLL_INTERVAL = 0.05
+
+# Flight key -> Future shared by the requests of this process
+_flights = {}
+_flights_lock = threading.Lock()
+
+# leaders, followers, remote_followers, fallbacks
+stats = Counter()
+
+
+def _count(name):
+    with _flights_lock:
+        stats[name] += 1
+
+
+def is_enabled():
+    return getattr(settings, 'CHAT_SINGLE_FLIGHT_ENABLED', True)
+
+
+def get_wait():
+    return getattr(settings, 'CHAT_SINGLE_FLIGHT_WAIT', 60)
+
+
+def flight_key(user_message, persona):
+    """Same normalized message and persona (system prompt and completion options)"""
+    payload = json.dumps([persona, normalize_message(user_message)], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class Flight:
+    """
+    One request's part in a coalesced completion.
+
+    The leader must end with publish(reply) or close(); a follower awaits
+    wait(), which returns the shared reply or None.
+    """
+
+    def __init__(self, key, future, is_leader, remote=False):
+        self.key = key
+        self.future = future
+        self.is_leader = is_leader
+        # Following a leader in another worker, on behalf of this process
+        self.remote = remote
+        self._holds_lock = is_leader
+
+    def _resolve(self, reply):
+        with _flights_lock:
+            if _flights.get(self.key) is self.future:
+                del _flights[self.key]
+            if not self.future.done():
+                self.future.set_result(reply)
+
+    async def _release_lock(self):
+        if self._holds_lock:
+            self._holds_lock = False
+            await cache.adelete(LOCK_KEY.format(self.key))
+
+    async def publish(self, reply):
+        """Share the leader's reply with the requests waiting for it"""
+        if reply:
+            await cache.aset(
+                RESULT_KEY.format(self.key), reply,
+                timeout=getattr(settings, 'CHAT_SINGLE_FLIGHT_RESULT_TTL', 10),
+            )
+        self._resolve(reply or None)
+        await self._release_lock()
+
+    async def close(self):
+        """End the flight; waiters fall back to their own call if nothing was published"""
+        self._resolve(None)
+        await self._release_lock()
+
+    async def _poll(self):
+        """Wait for the leader in another worker to publish its reply"""
+        deadline = time.monotonic() + get_wait()
+        result_key, lock_key = RESULT_KEY.format(self.key), LOCK_KEY.format(self.key)
+        while time.monotonic() < deadline:
+            reply = await cache.aget(result_key)
+            if reply is not None:
+                return reply
+            if not await cache.ahas_key(lock_key):
+                # The leader finished: published just now, or failed
+                return await cache.aget(result_key)
+            await asyncio.sleep(POLL_INTERVAL)
+        return None
+
+    async def wait(self):
+        if self.remote:
+            reply = await self._poll()
+            self._resolve(reply)
+        else:
+            try:
+                # Shielded: a waiter giving up must not cancel the shared future
+                reply = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(self.future)), get_wait())
+            except asyncio.TimeoutError:
+                reply = None
+        if reply is None:
+            _count('fallbacks')
+        return reply
+
+
+async def join(user_message, persona):
+    """
+    The Flight of this request: the leader when no identical chat is in
+    flight, otherwise a follower of the one that is.
+    """
+    key = flight_key(user_message, persona)
+    with _flights_lock:
+        future = _flights.get(key)
+        if future is not None:
+            stats['followers'] += 1
+            return Flight(key, future, is_leader=False)
+        future = _flights[key] = concurrent.futures.Future()
+
+    if await cache.aadd(LOCK_KEY.format(key), 1, timeout=get_wait()):
+        _count('leaders')
+        return Flight(key, future, is_leader=True)
+    _count('remote_followers')
+    return Flight(key, future, is_leader=False, remote=True)
+
+
+def get_stats():
+    with _flights_lock:
+        return dict(stats, in_flight=len(_flights), enabled=is_enabled())
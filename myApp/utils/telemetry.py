@@ -0,0 +1,157 @@
+"""
+Telemetry - Timings, token counts and outcome of every chat turn
+
+chat.chat_turn calls record() once per turn. record() only appends a dict
+to a bounded in-memory ring buffer (CHAT_TELEMETRY_BUFFER_SIZE entries), so
+the request never waits on the database. A daemon thread per process
+drains the buffer into the ChatCall table with bulk_create, every
+CHAT_TELEMETRY_FLUSH_INTERVAL seconds or as soon as CHAT_TELEMETRY_BATCH_SIZE
+calls are waiting, and at exit.
+
+If the database falls behind, the oldest unflushed calls are dropped rather
+than holding memory; get_stats() counts them. Rows older than
+CHAT_TELEMETRY_RETENTION_DAYS are deleted by the flusher about once an hour.
+
+summarize() turns rows into the percentiles and error rates shown on the
+dashboard's chat telemetry page.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PRUNE_INTERVAL = 60 * 60
+
+_buffer = deque(maxlen=getattr(settings, 'CHAT_TELEMETRY_BUFFER_SIZE', 2000))
+_buffer_lock = threading.Lock()
+_wake = threading.Event()
+_flusher = None
+_last_prune = 0
+
+# recorded, dropped, flushed, flush_errors
+stats = Counter()
+
+
+def is_enabled():
+    return getattr(settings, 'CHAT_TELEMETRY_ENABLED', True)
+
+
+def record(**fields):
+    """
+    Queue one chat turn for the ChatCall table: outcome, total_ms and any of
+    source, model, error, streamed, queue_ms, upstream_ms, ttft_ms,
+    prompt_tokens and completion_tokens.
+    """
+    if not is_enabled():
+        return
+    fields.setdefault('created_at', timezone.now())
+    with _buffer_lock:
+        if len(_buffer) == _buffer.maxlen:
+            stats['dropped'] += 1
+        _buffer.append(fields)
+        stats['recorded'] += 1
+        waiting = len(_buffer)
+    _start_flusher()
+    if waiting >= getattr(settings, 'CHAT_TELEMETRY_BATCH_SIZE', 100):
+        _wake.set()
+
+
+def _start_flusher():
+    global _flusher
+    if _flusher is not None:
+        return
+    with _buffer_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name='chat-telemetry', daemon=True)
+            _flusher.start()
+            atexit.register(flush)
+
+
+def _flush_loop():
+    while True:
+        _wake.wait(getattr(settings, 'CHAT_TELEMETRY_FLUSH_INTERVAL', 5))
+        _wake.clear()
+        # A long-lived thread: don't keep a connection past CONN_MAX_AGE or after an error
+        close_old_connections()
+        flush()
+
+
+def flush():
+    """Write the buffered calls to the database; returns how many were written"""
+    global _last_prune
+    from ..models import ChatCall
+
+    with _buffer_lock:
+        batch = list(_buffer)
+        _buffer.clear()
+    if batch:
+        try:
+            ChatCall.objects.bulk_create(
+                [ChatCall(**fields) for fields in batch],
+                batch_size=getattr(settings, 'CHAT_TELEMETRY_BATCH_SIZE', 100),
+            )
+        except DatabaseError:
+            logger.exception('Could not write %d chat telemetry rows', len(batch))
+            with _buffer_lock:
+                stats['flush_errors'] += 1
+                stats['dropped'] += len(batch)
+            return 0
+        with _buffer_lock:
+            stats['flushed'] += len(batch)
+
+    if time.monotonic() - _last_prune > PRUNE_INTERVAL:
+        _last_prune = time.monotonic()
+        cutoff = timezone.now() - timedelta(days=getattr(settings, 'CHAT_TELEMETRY_RETENTION_DAYS', 30))
+        try:
+            ChatCall.objects.filter(created_at__lt=cutoff).delete()
+        except DatabaseError:
+            logger.exception('Could not prune chat telemetry')
+    return len(batch)
+
+
+def percentile(values, share):
+    """Nearest-rank percentile of a list of numbers, None when empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def summarize(rows):
+    """
+    Calls, error rate, latency percentiles and tokens of ChatCall rows, given
+    as dicts (a .values() queryset)
+    """
+    rows = list(rows)
+    errors = sum(1 for row in rows if row['outcome'] != 'ok')
+    summary = {
+        'calls': len(rows),
+        'errors': errors,
+        'error_rate': errors / len(rows) if rows else 0,
+        'outcomes': Counter(row['outcome'] for row in rows).most_common(),
+        'sources': Counter(row['source'] for row in rows if row['outcome'] == 'ok').most_common(),
+        'prompt_tokens': sum(row['prompt_tokens'] or 0 for row in rows),
+        'completion_tokens': sum(row['completion_tokens'] or 0 for row in rows),
+    }
+    for field in ('total_ms', 'queue_ms', 'upstream_ms', 'ttft_ms'):
+        values = [row[field] for row in rows if row[field] is not None and row['outcome'] == 'ok']
+        summary[field] = {
+            'p50': percentile(values, 0.5),
+            'p95': percentile(values, 0.95),
+            'p99': percentile(values, 0.99),
+        }
+    return summary
+
+
+def get_stats():
+    """Buffer counters for this process"""
+    with _buffer_lock:
+        return dict(stats, buffered=len(_buffer), buffer_size=_buffer.maxlen, enabled=is_enabled())
@@ -1,18 +1,28 @@
 from django.shortcuts import render
-from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_http_methods, condition
+from django.views.decorators.cache import cache_control
 from django.views.decorators.csrf import csrf_exempt
-from django.conf import settings
+from django.utils.http import http_date, quote_etag
 import json
-import os
+import math
 import openai
-from .content_helpers import get_homepage_content_from_db
+from .content_cache import (
+    get_homepage_content, get_homepage_page, homepage_etag, homepage_last_modified,
+    store_homepage_content,
+)
+from .content_helpers import LazyHomepageContent
+from .chat import ChatNotConfigured, chat_turn
+from .utils import chat_sessions
+from .utils.openai_client import CircuitOpenError
+from .utils.rate_limit import RateLimited, check_rate_limit
 
-def home(request):
-    """Homepage view - uses database if available, falls back to empty content"""
+
+def _render_homepage(request):
+    """Render the homepage HTML - uses database if available, falls back to empty content"""
     try:
-        # Try to get content from database
-        content = get_homepage_content_from_db()
+        # Try to get content from the cached snapshot (built from the database)
+        content = get_homepage_content()
     except Exception as e:
         # Fall back to empty content if database is not set up
         content = {}
@@ -20,87 +30,131 @@ def home(request):
     context = {
         "content": content
     }
-    return render(request, "myApp/home.html", context)
+    response = render(request, "myApp/home.html", context)
+
+    # Keep the sections the templates read for the next request
+    if isinstance(content, LazyHomepageContent):
+        store_homepage_content(content)
+    return response.content
+
+
+# Browsers and CDNs may store the page but must revalidate it; the
+# revalidation is answered with a 304 without rendering any templates
+@cache_control(no_cache=True)
+@condition(etag_func=homepage_etag, last_modified_func=homepage_last_modified)
+def home(request):
+    """Homepage view - serves the cached page, rebuilding it after content changes"""
+    etag = homepage_etag(request)
+    last_modified = homepage_last_modified(request)
+    if etag is None:
+        # Cache unavailable - render directly
+        return HttpResponse(_render_homepage(request))
+
+    page = get_homepage_page(etag, last_modified.timestamp(), lambda: _render_homepage(request))
+
+    response = HttpResponse(page['html'])
+    # A stale page keeps its own validators so clients revalidate it later
+    response['ETag'] = quote_etag(page['etag'])
+    response['Last-Modified'] = http_date(page['last_modified'])
+    return response
+
+
+def _sse_event(data):
+    """One Server-Sent Event carrying a JSON payload"""
+    return f"data: {json.dumps(data)}\n\n".encode('utf-8')
+
+
+async def stream_chat_events(events):
+    """
+    Yield the rest of a chat turn (see chat.chat_turn) as Server-Sent Events
+    while it is generated: {"delta": "..."} per chunk of text, then
+    {"done": true, "response": "...", "source": "..."} with the full reply,
+    or {"error": "..."} if generation fails midway.
+    """
+    try:
+        async for event in events:
+            yield _sse_event(event)
+    except openai.APIError as e:
+        yield _sse_event({'error': f'OpenAI API error: {str(e)}'})
+    except Exception as e:
+        yield _sse_event({'error': f'An error occurred: {str(e)}'})
+    finally:
+        await events.aclose()
 
 
 @csrf_exempt
 @require_http_methods(["POST"])
-def chat_with_maria(request):
-    """AI Chatbot endpoint - handles chat messages with OpenAI"""
+async def chat_with_maria(request):
+    """
+    AI Chatbot endpoint - handles chat messages with OpenAI
+    With "stream": true in the request body the reply is streamed as
+    Server-Sent Events (see stream_chat_events) instead of one JSON response.
+    The same chat is served over a WebSocket by consumers.ChatConsumer.
+
+    The client sends only the new message and the session_id it was given
+    (X-Chat-Session-Id header / "session_id" in the JSON response); the
+    history is kept server-side (see utils.chat_sessions).
+
+    The view is async: served through myProject.asgi (daphne), a chat waiting
+    on OpenAI holds no worker thread. Under WSGI it still works, but a
+    streamed reply is buffered until it is complete.
+
+    The reply comes from chat.chat_turn: a local answer, a cached or
+    coalesced reply, or the chat backend through utils.openai_client
+    (pooled client, retries, circuit breaker). "source" in the response
+    (and the X-Chat-Source header) says which. While the circuit is open
+    the view answers 503 right away.
+
+    Each client IP and session is rate limited, and at most
+    CHAT_MAX_IN_FLIGHT chats wait on OpenAI at once (see utils.rate_limit);
+    over either limit the view answers 429 with Retry-After.
+    """
     try:
-        # Check if OpenAI API key is configured
-        openai_api_key = getattr(settings, 'OPENAI_API_KEY', None) or os.getenv('OPENAI_API_KEY', '')
-        
-        if not openai_api_key:
-            return JsonResponse({
-                'error': 'OpenAI API key not configured. Please add OPENAI_API_KEY to your .env file in the project root.'
-            }, status=500)
-        
-        # Initialize OpenAI client
-        client = openai.OpenAI(api_key=openai_api_key)
-        
         # Parse request data
         data = json.loads(request.body)
+        session_id = data.get('session_id')
+        await check_rate_limit(request, session_id if chat_sessions.is_session_id(session_id) else None)
         user_message = data.get('message', '').strip()
-        conversation_history = data.get('history', [])
         
         if not user_message:
             return JsonResponse({'error': 'Message is required'}, status=400)
+        if len(user_message) > chat_sessions.get_max_message_chars():
+            return JsonResponse({'error': 'Message is too long'}, status=400)
         
-        # System prompt that captures Maria Gregory's voice
-        system_prompt = """You are Maria Gregory, a Mentor of Mentors. You work with leaders, coaches, and high-responsibility professionals — the people everyone else turns to.
-
-Your communication style:
-- Use first-person language ("I", "me", "my")
-- Be warm, reflective, and deeply present
-- Ask thoughtful, open-ended questions that invite self-reflection
-- Acknowledge the weight people carry without minimizing it
-- Speak with wisdom, not quick answers
-- Create space for people to be fully human — messy, honest, and still deeply respected
-- Use language that feels like a trusted guide, not a coach or consultant
-- Be gentle but honest
-- Reference your work, your book "The Lion You Don't See", and your mentorship approach naturally when relevant
-
-Key themes you often explore:
-- The weight of leadership and responsibility
-- Where leaders go when they need support
-- The parts of leadership that don't fit on LinkedIn
-- Being fully human while leading
-- Inner strength and the "lion within"
-- The importance of having someone in your corner
-
-Keep responses conversational, warm, and typically 2-4 sentences. Always end with a question or invitation to go deeper when appropriate. Be authentic to who Maria is — someone who sees strength in others and helps them remember their own wisdom."""
-
-        # Build conversation messages
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # Add conversation history (last 10 messages to keep context manageable)
-        for msg in conversation_history[-10:]:
-            messages.append({
-                "role": msg.get("role", "user"),
-                "content": msg.get("content", "")
+        # Any "history" sent by older clients is ignored
+        session_id, session = await chat_sessions.load_session(session_id)
+
+        # Runs until the reply is on its way: refusals are raised here
+        events = chat_turn(session_id, session, user_message, stream=bool(data.get('stream')))
+        start = await anext(events)
+
+        if data.get('stream'):
+            response = StreamingHttpResponse(stream_chat_events(events), content_type='text/event-stream')
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'  # Don't let a proxy buffer the stream
+        else:
+            done = [event async for event in events if event.get('done')][0]
+            response = JsonResponse({
+                'response': done['response'],
+                'session_id': session_id,
+                'source': done['source'],
+                'success': True
             })
+        response['X-Chat-Session-Id'] = session_id
+        response['X-Chat-Source'] = start['source']
+        return response
         
-        # Add current user message
-        messages.append({"role": "user", "content": user_message})
-        
-        # Call OpenAI API
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",  # Using gpt-4o-mini for cost-effectiveness, can upgrade to gpt-4 if needed
-            messages=messages,
-            temperature=0.8,  # Slightly creative but still consistent
-            max_tokens=300,  # Keep responses concise
-            top_p=0.9,
-        )
-        
-        # Extract response
-        ai_response = response.choices[0].message.content.strip()
-        
-        return JsonResponse({
-            'response': ai_response,
-            'success': True
-        })
-        
+    except ChatNotConfigured as e:
+        return JsonResponse({'error': str(e)}, status=500)
+    except RateLimited as e:
+        response = JsonResponse({'error': str(e)}, status=429)
+        response['Retry-After'] = str(math.ceil(e.retry_after))
+        return response
+    except CircuitOpenError as e:
+        # OpenAI is failing: answer right away instead of queueing more calls
+        response = JsonResponse({'error': str(e)}, status=503)
+        response['Retry-After'] = str(math.ceil(e.retry_after))
+        return response
     except openai.APIError as e:
         return JsonResponse({
             'error': f'OpenAI API error: {str(e)}'
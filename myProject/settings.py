@@ -42,6 +42,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'myApp.middleware.PublishedHomepageMiddleware',
 ]
 
 ROOT_URLCONF = 'myProject.urls'
@@ -64,6 +65,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'myProject.wsgi.application'
 
+# Used by daphne; the async chat endpoint only frees its worker under ASGI
+ASGI_APPLICATION = 'myProject.asgi.application'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
@@ -76,6 +80,66 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Everything in the cache must be shared by every worker: the homepage content
+# and model versions (an edit in one worker invalidates the others, and they
+# all send the same ETags and fragment keys), the rendered page, the chat rate
+# limits and in-flight slots, and the chat conversations. Use Redis when
+# REDIS_URL is set; otherwise the cache lives in database tables (created by
+# migrations 0013 and 0014). Never the local-memory cache: it is per process,
+# so workers would serve stale content with no time limit. Each process still
+# keeps its last snapshot and page in memory (see myApp/content_cache.py), so
+# a steady-state homepage request costs one cache read.
+#
+# Chat conversations (myApp/utils/chat_sessions.py) use the 'chat_sessions'
+# alias, so a visitor whose next message lands on another gunicorn worker
+# keeps the history.
+
+REDIS_URL = os.getenv('REDIS_URL', '')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'app_cache',
+            'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000))},
+        }
+    }
+
+CACHES['chat_sessions'] = CACHES['default'] if REDIS_URL else {
+    'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+    'LOCATION': 'chat_session_cache',
+    'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CHAT_SESSION_MAX_ENTRIES', 10000))},
+}
+
+# Seconds an assembled homepage snapshot may live in the cache
+HOMEPAGE_CACHE_TIMEOUT = int(os.getenv('HOMEPAGE_CACHE_TIMEOUT', 60 * 60 * 24))
+
+# After a content change one worker rebuilds the cached homepage under a lock
+# while the others keep serving the previous page for up to this many seconds
+# (0 = never serve a stale page)
+HOMEPAGE_MAX_STALENESS = int(os.getenv('HOMEPAGE_MAX_STALENESS', 30))
+HOMEPAGE_REBUILD_LOCK_TIMEOUT = int(os.getenv('HOMEPAGE_REBUILD_LOCK_TIMEOUT', 30))
+
+# Old HomepageSnapshot rows kept for rollback
+HOMEPAGE_SNAPSHOT_KEEP = int(os.getenv('HOMEPAGE_SNAPSHOT_KEEP', 50))
+
+
+# Static export of the homepage (python manage.py publish_homepage, or the
+# dashboard "Publish" button). "/" is served from these files while they
+# match the current content.
+HOMEPAGE_EXPORT_ROOT = Path(os.getenv('HOMEPAGE_EXPORT_ROOT', BASE_DIR / 'published'))
+HOMEPAGE_SERVE_PUBLISHED = os.getenv('HOMEPAGE_SERVE_PUBLISHED', 'True') == 'True'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -129,6 +193,16 @@ cloudinary.config(
     secure=True
 )
 
+# Django's default upload handlers, also hashing each file as it arrives (see myApp/upload_handlers.py)
+FILE_UPLOAD_HANDLERS = [
+    'myApp.upload_handlers.Sha256MemoryFileUploadHandler',
+    'myApp.upload_handlers.Sha256TemporaryFileUploadHandler',
+]
+
+# Dashboard batch uploads (see upload_many in myApp/utils/cloudinary_utils.py)
+IMAGE_UPLOAD_MAX_WORKERS = int(os.getenv('IMAGE_UPLOAD_MAX_WORKERS', 4))  # files uploaded at once per request
+IMAGE_UPLOAD_TIMEOUT = int(os.getenv('IMAGE_UPLOAD_TIMEOUT', 60))  # seconds per file
+
 # Authentication Settings
 LOGIN_URL = '/dashboard/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'
@@ -136,3 +210,81 @@ LOGOUT_REDIRECT_URL = '/dashboard/login/'
 
 # OpenAI Configuration
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
+# Alternative API endpoint, e.g. the local fake upstream (myApp/utils/fake_openai.py)
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', '')
+
+# Where chat completions come from (see myApp/utils/chat_backends.py):
+# myApp.utils.chat_backends.OpenAIBackend, or FakeBackend for offline load tests
+CHAT_BACKEND = os.getenv('CHAT_BACKEND', 'myApp.utils.chat_backends.OpenAIBackend')
+# Keyword arguments of the backend, e.g. {'latency': 0.8, 'error_rate': 0.02} for FakeBackend
+CHAT_BACKEND_OPTIONS = {}
+
+# OpenAI client (see myApp/utils/openai_client.py)
+OPENAI_TIMEOUT = 20  # seconds per attempt
+OPENAI_CONNECT_TIMEOUT = 5
+OPENAI_MAX_RETRIES = 2  # retries of timeouts, connection errors, 429 and 5xx
+OPENAI_RETRY_BASE_DELAY = 0.5  # full-jitter exponential backoff, in seconds
+OPENAI_RETRY_MAX_DELAY = 8
+OPENAI_MAX_CONNECTIONS = 100
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = 20
+# Circuit breaker: open once half of the last 20 calls failed (at least 5 calls),
+# then let one trial call through after 30 seconds
+OPENAI_BREAKER_THRESHOLD = 0.5
+OPENAI_BREAKER_WINDOW = 20
+OPENAI_BREAKER_MIN_CALLS = 5
+OPENAI_BREAKER_RESET_TIMEOUT = 30
+
+# Chat sessions, kept in the cache (see myApp/utils/chat_sessions.py)
+CHAT_SESSION_TTL = 60 * 30  # seconds after the last turn
+CHAT_SESSION_MAX_MESSAGES = 20
+CHAT_MESSAGE_MAX_CHARS = 2000
+
+# Prompt assembly (see myApp/utils/prompt_builder.py)
+CHAT_PROMPT_TOKEN_BUDGET = 1200  # system prompt + summary + recent turns + new message
+CHAT_RECENT_MESSAGES = 6  # messages kept verbatim when older ones are summarized
+CHAT_SUMMARY_EVERY = 4  # turns between summary refreshes
+CHAT_SUMMARY_MAX_TOKENS = 200
+
+# Site content retrieval for the chat prompt (see myApp/utils/retrieval.py)
+CHAT_RETRIEVAL_TOP_K = 3
+CHAT_RETRIEVAL_TOKEN_BUDGET = 300  # counted inside CHAT_PROMPT_TOKEN_BUDGET
+CHAT_RETRIEVAL_MIN_SCORE = 0.15  # cosine similarity
+# Opening questions matching an FAQ/service at least this close are answered locally, without OpenAI (above 1 disables)
+CHAT_LOCAL_ANSWER_THRESHOLD = 0.45
+
+# Reuse replies to repeated opening lines (see myApp/utils/response_cache.py)
+CHAT_RESPONSE_CACHE_ENABLED = os.getenv('CHAT_RESPONSE_CACHE_ENABLED', 'False') == 'True'  # opt-in
+CHAT_RESPONSE_CACHE_SIZE = 256  # entries per process
+CHAT_RESPONSE_CACHE_TTL = 60 * 60  # seconds
+CHAT_RESPONSE_CACHE_HISTORY = 2  # recent messages that are part of the key
+CHAT_RESPONSE_CACHE_MAX_WORDS = 12  # longer messages are never cached
+
+# Chat throttling, shared by all workers through the cache (see myApp/utils/rate_limit.py)
+# Proxies in front of the app that append to X-Forwarded-For (Railway: 1); 0 trusts only the peer address.
+# Without it every visitor behind the proxy shares one rate-limit bucket.
+CHAT_TRUSTED_PROXY_COUNT = int(os.getenv('CHAT_TRUSTED_PROXY_COUNT', 0))
+CHAT_RATE_LIMIT_RATE = float(os.getenv('CHAT_RATE_LIMIT_RATE', 0.2))  # messages per second per IP / session
+CHAT_RATE_LIMIT_BURST = int(os.getenv('CHAT_RATE_LIMIT_BURST', 5))  # messages allowed at once
+CHAT_MAX_IN_FLIGHT = int(os.getenv('CHAT_MAX_IN_FLIGHT', 50))  # chats waiting on OpenAI, all workers
+CHAT_IN_FLIGHT_LEASE = 120  # seconds before a slot left by a dead worker frees itself
+CHAT_BUSY_RETRY_AFTER = 5  # Retry-After, in seconds, when every slot is taken
+
+# Identical openers in flight share one completion (see myApp/utils/single_flight.py)
+CHAT_SINGLE_FLIGHT_ENABLED = True
+CHAT_SINGLE_FLIGHT_WAIT = 60  # seconds a request waits on another's completion
+CHAT_SINGLE_FLIGHT_RESULT_TTL = 10  # seconds a reply stays readable by other workers
+
+# Chat over a WebSocket (see myApp/consumers.py); the consumer keeps no
+# state in the layer, so the in-process one is enough
+CHANNEL_LAYERS = {
+    'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'},
+}
+CHAT_WS_MAX_QUEUED = 2  # messages waiting behind the one being answered, per connection
+CHAT_WS_IDLE_TIMEOUT = 60 * 5  # seconds without a message before the socket is closed
+
+# Chat timings and token counts, flushed to the ChatCall table in batches (see myApp/utils/telemetry.py)
+CHAT_TELEMETRY_ENABLED = True
+CHAT_TELEMETRY_BUFFER_SIZE = 2000  # calls held per process; the oldest are dropped past that
+CHAT_TELEMETRY_BATCH_SIZE = 100  # a flush starts early once this many are waiting
+CHAT_TELEMETRY_FLUSH_INTERVAL = 5  # seconds
+CHAT_TELEMETRY_RETENTION_DAYS = 30